@@ -0,0 +1,75 @@
+"""
+Content-addressed blob store on local disk.
+
+Blobs are named by the SHA-256 of their bytes plus an extension and kept
+under ``BLOB_DIR/<first two hex digits>/``, so identical content is stored
+once however many rows refer to it. Writes go through a temporary file and
+an atomic rename, so readers never see a partial blob. Storing content
+that is already present refreshes the blob's mtime, which ``delete`` can
+use to leave alone blobs that a concurrent writer has just referenced.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Optional
+
+from app.config import settings
+
+_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9+]{1,8}$")
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, name: str) -> str:
+        """Return the file path of a blob; raises ValueError for a malformed name."""
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid blob name: {name}")
+        return os.path.join(self.root, name[:2], name)
+
+    def put(self, content: bytes, extension: str) -> str:
+        """Store ``content`` unless already present and return its blob name."""
+        name = f"{hashlib.sha256(content).hexdigest()}.{extension}"
+        path = self.path(name)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+                return name
+            except FileNotFoundError:
+                pass  # deleted meanwhile; write it again
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return name
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self.path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def delete(self, name: str, min_age: float = 0) -> None:
+        """Remove a blob, unless it was stored less than ``min_age`` seconds ago."""
+        path = self.path(name)
+        try:
+            if min_age and time.time() - os.path.getmtime(path) < min_age:
+                return
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+blob_store = BlobStore(settings.BLOB_DIR)
@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe bounded LRU mapping with hit/miss/eviction counters.
+
+    Besides the entry count, the cache can be bounded by total weight:
+    ``weigher(value)`` gives each entry's weight (e.g. bytes) and entries
+    are evicted until the total is at most ``max_weight``. With ``ttl``
+    (seconds), entries also expire that long after they were stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        max_weight: Optional[int] = None,
+        weigher: Optional[Callable[[Any], int]] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._weights: Dict[Hashable, int] = {}
+        self._expires: Dict[Hashable, float] = {}
+        self._total_weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, marking it most recently used."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self._expires[key] <= time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        if self.maxsize <= 0:
+            return
+        weight = self.weigher(value) if self.weigher else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        with self._lock:
+            self._total_weight += weight - self._weights.get(key, 0)
+            self._weights[key] = weight
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.maxsize or (
+                self.max_weight is not None and self._total_weight > self.max_weight
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, building it with factory on a miss.
+
+        The factory runs outside the lock so a slow build never blocks
+        readers of other keys; exceptions propagate and nothing is cached.
+        """
+        sentinel = _MISSING
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def _remove(self, key: Hashable) -> Any:
+        # Caller holds the lock
+        self._total_weight -= self._weights.pop(key, 0)
+        self._expires.pop(key, None)
+        return self._data.pop(key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def discard_matching(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key satisfies predicate; return how many."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self._expires.clear()
+            self._total_weight = 0
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Return counters used to size the cache."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "weight": self._total_weight,
+                "max_weight": self.max_weight,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            if self.ttl is not None and key in self._expires:
+                return self._expires[key] > time.monotonic()
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class DiskCache:
+    """Persistent key/value store backed by a SQLite file.
+
+    Values are stored as bytes so the store survives restarts and can be
+    shared by several worker processes on the same host. With ``max_bytes``
+    the least recently used entries are deleted once the stored values
+    exceed that size.
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.max_bytes is not None:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            if self.max_bytes is not None:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Caller holds the lock
+        excess = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            size, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            return {
+                "size": size,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class TwoTierCache:
+    """In-memory LRU in front of a DiskCache.
+
+    Values are serialized with ``dumps``/``loads`` for the disk tier; disk
+    hits are promoted into memory.
+    """
+
+    def __init__(self, memory: LRUCache, disk: DiskCache, dumps: Callable, loads: Callable):
+        self.memory = memory
+        self.disk = disk
+        self.dumps = dumps
+        self.loads = loads
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        raw = self.disk.get(key)
+        if raw is None:
+            return default
+        value = self.loads(raw)
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        self.disk.set(key, self.dumps(value))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+_MISSING = object()
@@ -0,0 +1,139 @@
+"""
+Symbolic (CAS) operations.
+
+Each operation takes the raw expression string and the request settings
+and returns a JSON-ready response dict. They are plain module-level
+functions so they can be shipped to worker processes by name.
+"""
+from typing import Any, Dict
+
+import sympy as sp
+
+from app.cas_keys import CANONICAL_KEY, LATEX, result_key
+
+
+def _expression_result(result) -> Dict[str, Any]:
+    return {
+        "result": str(result),
+        "latex": sp.latex(result),
+        "type": "expression"
+    }
+
+
+def simplify(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Simplify an expression."""
+    return _expression_result(sp.simplify(sp.sympify(expr)))
+
+
+def factor(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Factor an expression."""
+    return _expression_result(sp.factor(sp.sympify(expr)))
+
+
+def expand(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand an expression."""
+    return _expression_result(sp.expand(sp.sympify(expr)))
+
+
+def solve(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Solve an equation for ``options["variable"]``."""
+    variable = options.get("variable", "x")
+
+    # Check if the expression contains an equals sign
+    if "=" in expr:
+        left, right = expr.split("=", 1)
+        equation = sp.sympify(left) - sp.sympify(right)
+    else:
+        equation = sp.sympify(expr)
+
+    # Solve the equation
+    solutions = sp.solve(equation, sp.Symbol(variable))
+
+    # Format the solutions
+    if isinstance(solutions, list):
+        result = [str(sol) for sol in solutions]
+        latex_sols = [sp.latex(sol) for sol in solutions]
+        latex = ", ".join([f"{variable} = {sol}" for sol in latex_sols])
+    else:
+        result = str(solutions)
+        latex = f"{variable} = {sp.latex(solutions)}"
+
+    return {
+        "result": result,
+        "latex": latex,
+        "type": "expression"
+    }
+
+
+def integrate(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Integrate an expression, definitely when ``options["limits"]`` is set."""
+    var = sp.Symbol(options.get("variable", "x"))
+    limits = options.get("limits", None)
+
+    if limits:
+        lower, upper = limits
+        result = sp.integrate(sp.sympify(expr), (var, lower, upper))
+    else:
+        result = sp.integrate(sp.sympify(expr), var)
+    return _expression_result(result)
+
+
+def differentiate(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Differentiate an expression ``options["order"]`` times."""
+    var = sp.Symbol(options.get("variable", "x"))
+    order = options.get("order", 1)
+    return _expression_result(sp.diff(sp.sympify(expr), var, order))
+
+
+def limit(expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Calculate the limit of an expression."""
+    var = sp.Symbol(options.get("variable", "x"))
+    approach = options.get("approach", 0)
+    direction = options.get("direction", "+")
+    return _expression_result(sp.limit(sp.sympify(expr), var, approach, direction))
+
+
+def canonical_key(operation: str, expr: str, options: Dict[str, Any]) -> str:
+    """
+    Build a result-cache key from the operation, the ``srepr`` of the
+    sympified input and the settings that affect the result.
+
+    Spelling differences such as whitespace or term order map to the same
+    key because they sympify to the same tree. Sympifying is unbounded,
+    so this runs on a CAS worker like the operations themselves.
+    """
+    if operation == "solve" and "=" in expr:
+        left, right = expr.split("=", 1)
+        canonical = sp.srepr(sp.sympify(left) - sp.sympify(right))
+    else:
+        canonical = sp.srepr(sp.sympify(expr))
+    return result_key(operation, canonical, options)
+
+
+OPERATIONS = {
+    "simplify": simplify,
+    "factor": factor,
+    "expand": expand,
+    "solve": solve,
+    "integrate": integrate,
+    "differentiate": differentiate,
+    "limit": limit,
+}
+
+
+def run_operation(operation: str, expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Dispatch a CAS operation by name.
+
+    ``CANONICAL_KEY`` returns the canonical key for
+    ``options["operation"]`` with ``options["options"]`` instead, and
+    ``LATEX`` the LaTeX form of ``expr``.
+    """
+    if operation == CANONICAL_KEY:
+        return canonical_key(options["operation"], expr, options["options"])
+    if operation == LATEX:
+        return sp.latex(sp.sympify(expr))
+    try:
+        func = OPERATIONS[operation]
+    except KeyError:
+        raise ValueError(f"Unsupported CAS operation: {operation}")
+    return func(expr, options)
@@ -0,0 +1,254 @@
+"""
+Process pool for SymPy work.
+
+SymPy calls cannot be interrupted from another thread, so CAS operations
+run in dedicated worker processes. A task that exceeds its timeout has its
+worker killed and replaced, and the number of tasks running or waiting is
+bounded so overload is rejected instead of piling up request threads.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+# How often a cancellable task checks whether it has been cancelled
+CANCEL_POLL_SECONDS = 0.25
+
+
+class CASBusyError(Exception):
+    """Raised when the executor queue is full."""
+
+
+class CASTimeoutError(Exception):
+    """Raised when a CAS task runs past its timeout."""
+
+
+class CASCancelledError(Exception):
+    """Raised when a CAS task is cancelled while running."""
+
+
+class CASOperationError(Exception):
+    """Raised when a CAS operation fails inside a worker."""
+
+
+class CASWorkerError(CASOperationError):
+    """Raised when a worker process dies mid-task (a server fault, not bad input)."""
+
+
+def _worker_main(conn) -> None:
+    # Imported here so the parent process never has to load SymPy
+    from app.cas import run_operation
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        operation, expr, options = task
+        try:
+            conn.send(("ok", run_operation(operation, expr, options)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class CASExecutor:
+    """Bounded pool of SymPy worker processes with hard per-task timeouts."""
+
+    def __init__(self, max_workers: int, max_queue: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        # None entries are free slots whose worker has not been (re)spawned yet
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        for _ in range(max_workers):
+            self._idle.put(None)
+        self._lock = threading.Lock()
+        self._workers = set()
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def submit(
+        self,
+        operation: str,
+        expr: str,
+        options: Dict[str, Any],
+        timeout: Optional[float] = None,
+        wait: bool = False,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        """Run a CAS operation in a worker process and return its result.
+
+        With ``wait`` the caller blocks for a queue slot instead of being
+        rejected. Setting ``cancel_event`` abandons a task still waiting for
+        a slot or worker, and kills the worker of a running one.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        # Waiting for a worker and running on it share one deadline
+        deadline = time.monotonic() + timeout
+        if not self._acquire_slot(wait, cancel_event):
+            with self._lock:
+                self.rejected += 1
+            raise CASBusyError("CAS executor is at capacity, try again later")
+        try:
+            worker = self._take_worker(deadline, timeout, cancel_event)
+            if worker is None:
+                try:
+                    worker = self._spawn()
+                except Exception:
+                    self._idle.put(None)
+                    raise
+            return self._run(worker, (operation, expr, options), deadline, timeout, cancel_event)
+        finally:
+            self._slots.release()
+
+    def _acquire_slot(self, wait: bool, cancel_event: Optional[threading.Event]) -> bool:
+        """Take a queue slot; a waiting caller gives up with CASCancelledError once cancelled."""
+        if not wait or cancel_event is None:
+            return self._slots.acquire(blocking=wait)
+        while not self._slots.acquire(timeout=CANCEL_POLL_SECONDS):
+            if cancel_event.is_set():
+                raise CASCancelledError("CAS task was cancelled")
+        return True
+
+    def _take_worker(
+        self, deadline: float, timeout: float, cancel_event: Optional[threading.Event]
+    ) -> Optional[_Worker]:
+        """Wait until ``deadline`` for an idle worker (or a free slot to spawn one in)."""
+        while True:
+            remaining = deadline - time.monotonic()
+            if cancel_event is not None and cancel_event.is_set():
+                raise CASCancelledError("CAS task was cancelled")
+            if remaining <= 0:
+                with self._lock:
+                    self.timeouts += 1
+                raise CASTimeoutError(f"CAS task waited more than {timeout} seconds for a worker")
+            poll = remaining if cancel_event is None else min(remaining, CANCEL_POLL_SECONDS)
+            try:
+                worker = self._idle.get(timeout=poll)
+            except queue.Empty:
+                continue
+            if cancel_event is not None and cancel_event.is_set():
+                # Cancelled while queued: hand the worker back untouched
+                self._idle.put(worker)
+                raise CASCancelledError("CAS task was cancelled")
+            return worker
+
+    def _run(
+        self,
+        worker: _Worker,
+        task,
+        deadline: float,
+        timeout: float,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        try:
+            worker.conn.send(task)
+            if not self._wait_for_result(worker, deadline, cancel_event):
+                self._replace(worker)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CASCancelledError("CAS task was cancelled")
+                with self._lock:
+                    self.timeouts += 1
+                raise CASTimeoutError(f"CAS computation exceeded {timeout} seconds")
+            status, payload = worker.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            # The worker died (e.g. out of memory); replace it
+            self._replace(worker)
+            with self._lock:
+                self.failed += 1
+            raise CASWorkerError("CAS worker exited unexpectedly")
+
+        self._idle.put(worker)
+        with self._lock:
+            if status == "ok":
+                self.completed += 1
+            else:
+                self.failed += 1
+        if status != "ok":
+            raise CASOperationError(payload)
+        return payload
+
+    @staticmethod
+    def _wait_for_result(worker: _Worker, deadline: float, cancel_event: Optional[threading.Event]) -> bool:
+        while cancel_event is None or not cancel_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            poll = remaining if cancel_event is None else min(remaining, CANCEL_POLL_SECONDS)
+            if worker.conn.poll(poll):
+                return True
+        return False
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            self.restarts += 1
+        # Respawned lazily by the next task that picks up this slot
+        self._idle.put(None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+cas_executor = CASExecutor(
+    max_workers=settings.CAS_WORKERS,
+    max_queue=settings.CAS_QUEUE_SIZE,
+    timeout=settings.CAS_TIMEOUT_SECONDS,
+)
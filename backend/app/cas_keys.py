@@ -0,0 +1,43 @@
+"""
+Result-cache keys for CAS operations.
+
+Kept free of SymPy so the web process can look results up without loading
+it. A request is first looked up under its whitespace-normalized text; the
+canonical key (the ``srepr`` of the sympified input) needs SymPy and is
+computed on a CAS worker, under the executor timeout.
+"""
+import hashlib
+import json
+from typing import Any, Dict
+
+# Settings that change each operation's result, with their defaults
+RESULT_SETTINGS = {
+    "simplify": {},
+    "factor": {},
+    "expand": {},
+    "solve": {"variable": "x"},
+    "integrate": {"variable": "x", "limits": None},
+    "differentiate": {"variable": "x", "order": 1},
+    "limit": {"variable": "x", "approach": 0, "direction": "+"},
+}
+
+# Pseudo-operation that computes the canonical key on a CAS worker
+CANONICAL_KEY = "canonical_key"
+
+# Pseudo-operation that renders the LaTeX form of an expression on a CAS worker
+LATEX = "latex"
+
+
+def result_key(operation: str, form: str, options: Dict[str, Any]) -> str:
+    """Hash an operation, a form of its input and the settings that affect the result."""
+    params = {
+        name: options.get(name, default)
+        for name, default in RESULT_SETTINGS.get(operation, {}).items()
+    }
+    raw = json.dumps([operation, form, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def text_key(operation: str, expr: str, options: Dict[str, Any]) -> str:
+    """Key on the input text with whitespace collapsed; needs no parsing."""
+    return result_key(operation, "text:" + " ".join(expr.split()), options)
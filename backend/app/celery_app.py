@@ -0,0 +1,24 @@
+"""
+Celery application for CAS jobs when ``JOB_BACKEND=celery``.
+
+Start a worker with::
+
+    celery -A app.celery_app:celery_app worker
+"""
+from celery import Celery
+
+from app.config import settings
+
+celery_app = Celery("calculator", broker=settings.REDIS_URL, backend=settings.REDIS_URL)
+celery_app.conf.update(
+    result_expires=settings.CAS_JOB_TTL_SECONDS,
+    task_track_started=True,
+    task_time_limit=settings.CAS_JOB_TIMEOUT_SECONDS,
+)
+
+
+@celery_app.task(name="cas.run_operation")
+def run_cas_operation(operation, expr, options):
+    from app.cas import run_operation
+
+    return run_operation(operation, expr, options)
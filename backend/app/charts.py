@@ -0,0 +1,217 @@
+"""
+Figure builders run on the render pool.
+
+Each function takes plain data, draws on its own ``Figure`` and returns the
+encoded image bytes. They are module-level and free of database and router
+imports so render worker processes can unpickle and run them cheaply.
+"""
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+
+from app.rendering import ImageOptions, figure_bytes, new_figure
+
+
+def function_plot(
+    plot_type: str,
+    label: str,
+    arrays: Dict[str, np.ndarray],
+    settings: Dict[str, Any],
+    image: ImageOptions = ImageOptions(),
+) -> bytes:
+    """Draw sampled plot arrays (see ``graph.sample_plot``) and return the image bytes."""
+    fig = new_figure(image.figsize)
+
+    if plot_type == "2d":
+        # Plot the function
+        ax = fig.add_subplot(111)
+        ax.plot(arrays["x"], arrays["y"], label=label)
+
+        # Add grid and labels
+        ax.grid(True, alpha=0.3)
+        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
+        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
+        ax.set_xlabel('x')
+        ax.set_ylabel('y')
+        ax.set_title(f'Plot of {label}')
+        ax.legend()
+
+        # Apply plot settings
+        if settings.get("y_min") is not None and settings.get("y_max") is not None:
+            ax.set_ylim(settings.get("y_min"), settings.get("y_max"))
+
+    elif plot_type == "parametric":
+        # Plot the parametric curve
+        ax = fig.add_subplot(111)
+        ax.plot(arrays["x"], arrays["y"])
+
+        # Add grid and labels
+        ax.grid(True, alpha=0.3)
+        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
+        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
+        ax.set_xlabel('x')
+        ax.set_ylabel('y')
+        ax.set_title(f'Parametric Plot: {label}')
+
+        # Apply plot settings
+        if settings.get("x_min") is not None and settings.get("x_max") is not None:
+            ax.set_xlim(settings.get("x_min"), settings.get("x_max"))
+        if settings.get("y_min") is not None and settings.get("y_max") is not None:
+            ax.set_ylim(settings.get("y_min"), settings.get("y_max"))
+
+    elif plot_type == "polar":
+        # Create polar plot
+        ax = fig.add_subplot(111, projection='polar')
+        ax.plot(arrays["theta"], arrays["r"])
+        ax.set_title(f'Polar Plot: {label}')
+        ax.grid(True)
+
+    elif plot_type == "3d":
+        # The x/y grid is only broadcast views of the sample vectors
+        z = arrays["z"]
+        X = np.broadcast_to(arrays["x"][None, :], z.shape)
+        Y = np.broadcast_to(arrays["y"][:, None], z.shape)
+
+        # Create 3D plot
+        ax = fig.add_subplot(111, projection='3d')
+        surf = ax.plot_surface(X, Y, z, cmap='viridis', alpha=0.8)
+
+        # Add labels and title
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        ax.set_zlabel('Z')
+        ax.set_title(f'3D Plot: {label}')
+        fig.colorbar(surf, ax=ax)
+
+    return figure_bytes(fig, image.format, image.dpi)
+
+
+def tile_image(x: np.ndarray, y: np.ndarray, bounds: Dict[str, float], size: int, fmt: str = "png") -> bytes:
+    """Draw a curve on a borderless, transparent square tile spanning exactly ``bounds``."""
+    dpi = 100
+    fig = new_figure((size / dpi, size / dpi))
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_xlim(bounds["x_min"], bounds["x_max"])
+    ax.set_ylim(bounds["y_min"], bounds["y_max"])
+    ax.plot(x, y, color='C0', linewidth=1.5)
+    return figure_bytes(fig, fmt, dpi, transparent=True)
+
+
+def _annotate(ax, text: str, x: float, ha: str) -> None:
+    ax.annotate(text, xy=(x, 0.95), xycoords='axes fraction',
+                ha=ha, va='top', bbox=dict(boxstyle='round', alpha=0.1))
+
+
+def histogram(
+    data: Sequence[float],
+    bins: Union[int, str],
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    color: str,
+    image: ImageOptions = ImageOptions(),
+) -> bytes:
+    """Draw a histogram annotated with mean, median and standard deviation."""
+    fig = new_figure(image.figsize)
+    ax = fig.add_subplot(111)
+    ax.hist(data, bins=bins, color=color, alpha=0.7, edgecolor='black')
+
+    # Add labels and title
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.3)
+
+    # Add descriptive statistics as text
+    stats_text = f"Mean: {np.mean(data):.2f}\nMedian: {np.median(data):.2f}"
+    if len(data) > 1:
+        stats_text += f"\nStd Dev: {np.std(data, ddof=1):.2f}"
+    _annotate(ax, stats_text, 0.95, 'right')
+
+    return figure_bytes(fig, image.format, image.dpi)
+
+
+def boxplot(
+    data: Sequence[float],
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    color: str,
+    image: ImageOptions = ImageOptions(),
+) -> bytes:
+    """Draw a box plot annotated with its five-number summary and IQR."""
+    fig = new_figure(image.figsize)
+    ax = fig.add_subplot(111)
+    box = ax.boxplot([data], patch_artist=True)
+    # Set on the axis rather than via boxplot(labels=...), which newer matplotlib renamed
+    ax.set_xticks([1], [xlabel])
+
+    # Set colors
+    for patch in box['boxes']:
+        patch.set_facecolor(color)
+        patch.set_alpha(0.7)
+
+    # Add labels and title
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.3)
+
+    # Add descriptive statistics as text
+    q1 = np.percentile(data, 25)
+    q3 = np.percentile(data, 75)
+    iqr = q3 - q1
+    stats_text = f"Min: {np.min(data):.2f}\nQ1: {q1:.2f}\nMedian: {np.median(data):.2f}"
+    stats_text += f"\nQ3: {q3:.2f}\nMax: {np.max(data):.2f}\nIQR: {iqr:.2f}"
+    _annotate(ax, stats_text, 0.95, 'right')
+
+    return figure_bytes(fig, image.format, image.dpi)
+
+
+def scatterplot(
+    x_data: List[float],
+    y_data: List[float],
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    color: str,
+    show_regression: bool,
+    regression_type: str,
+    image: ImageOptions = ImageOptions(),
+) -> bytes:
+    """Draw a scatter plot, optionally with a linear or quadratic fit."""
+    fig = new_figure(image.figsize)
+    ax = fig.add_subplot(111)
+    ax.scatter(x_data, y_data, color=color, alpha=0.7, edgecolor='black')
+
+    # Add regression line if requested
+    if show_regression:
+        if regression_type == "linear":
+            import scipy.stats as stats
+
+            # Linear regression
+            slope, intercept, r_value, p_value, std_err = stats.linregress(x_data, y_data)
+            x_line = np.linspace(min(x_data), max(x_data), 100)
+            y_line = slope * x_line + intercept
+            ax.plot(x_line, y_line, 'r-', alpha=0.7)
+
+            # Add regression equation and R² to plot
+            _annotate(ax, f"y = {slope:.4f}x + {intercept:.4f}\nR² = {r_value**2:.4f}", 0.05, 'left')
+
+        elif regression_type == "quadratic":
+            # Quadratic regression
+            coeffs = np.polyfit(x_data, y_data, 2)
+            x_line = np.linspace(min(x_data), max(x_data), 100)
+            y_line = coeffs[0] * x_line**2 + coeffs[1] * x_line + coeffs[2]
+            ax.plot(x_line, y_line, 'r-', alpha=0.7)
+
+            # Add regression equation to plot
+            _annotate(ax, f"y = {coeffs[0]:.4f}x² + {coeffs[1]:.4f}x + {coeffs[2]:.4f}", 0.05, 'left')
+
+    # Add labels and title
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.3)
+
+    return figure_bytes(fig, image.format, image.dpi)
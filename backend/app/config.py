@@ -40,6 +40,50 @@ class Settings(BaseSettings):
     DEFAULT_PRECISION: int = 34
     MAX_PRECISION: int = 200
     CAS_TIMEOUT_SECONDS: int = 30
+    CAS_WORKERS: int = 2
+    CAS_QUEUE_SIZE: int = 16
+    CAS_CACHE_SIZE: int = 2048
+
+    # Background Job Settings
+    JOB_BACKEND: str = os.getenv("JOB_BACKEND", "memory")  # memory, celery
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    CAS_JOB_TIMEOUT_SECONDS: int = 600
+    CAS_JOB_TTL_SECONDS: int = 3600
+    CAS_JOB_QUEUE_SIZE: int = 100
+    EXPRESSION_CACHE_SIZE: int = 4096
+    LATEX_CACHE_SIZE: int = 4096
+    LAMBDIFY_CACHE_SIZE: int = 1024
+    MAX_BATCH_SIZE: int = 500
+    MAX_SWEEP_POINTS: int = 1_000_000
+    EVAL_CHUNK_ELEMENTS: int = 262_144
+    MAX_MATRIX_ELEMENTS: int = 10_000_000
+    MATRIX_LATEX_MAX_ELEMENTS: int = 400
+    FACTORIZATION_CACHE_SIZE: int = 64
+    FACTORIZATION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    SESSION_CONTEXT_CACHE_SIZE: int = 256
+    SESSION_CONTEXT_TTL_SECONDS: int = 300
+    RENDER_WORKERS: int = 2
+    RENDER_QUEUE_SIZE: int = 32
+    RENDER_TIMEOUT_SECONDS: int = 60
+    IMAGE_MAX_SIDE: int = 4096  # pixels
+    IMAGE_MAX_DPI: int = 300
+    TILE_SIZE: int = 256  # pixels per tile side
+    TILE_BASE_SPAN: float = 16.0  # plot units covered by a tile at zoom 0
+    TILE_MIN_ZOOM: int = -16
+    TILE_MAX_ZOOM: int = 32
+
+    # Cache Settings
+    CACHE_DIR: str = "./cache"
+    PLOT_CACHE_SIZE: int = 256
+    PLOT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    PLOT_CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Warm-up Settings
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "True").lower() == "true"
+    WARMUP_TASKS: List[str] = ["sympy", "matplotlib", "scipy_stats", "cas_workers"]
+
+    # Blob Store Settings
+    BLOB_DIR: str = "./blobs"
 
     # Export Settings
     EXPORT_DIR: str = "./exports"
@@ -0,0 +1,92 @@
+import base64
+import io
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def encode_array(
+    arr: np.ndarray,
+    encoding: str = "base64",
+    dtype: Optional[str] = None,
+    decimals: int = 6,
+) -> Dict[str, Any]:
+    """
+    Encode a NumPy array as a compact columnar payload.
+
+    ``base64`` ships the raw little-endian buffer with its dtype and shape;
+    ``npy`` ships a base64 ``.npy`` file; ``list`` falls back to a flat JSON
+    list, with non-finite values as null, for clients that cannot decode
+    binary data; ``delta`` rounds to ``decimals`` places and ships the
+    differences of successive values as small JSON integers, with
+    non-finite values listed as ``gaps`` (a payload with finite values too
+    large to quantize at ``decimals`` places is sent as ``list`` instead).
+    Either way the shape is kept out of the nesting.
+    """
+    arr = np.asarray(arr)
+    if dtype is not None:
+        arr = arr.astype(dtype, copy=False)
+    if arr.dtype.kind == "c" and encoding == "list":
+        raise ValueError("Complex results cannot be encoded as a JSON list")
+    # ascontiguousarray promotes 0-d arrays to 1-d, so the shape is restored
+    arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<")).reshape(arr.shape)
+
+    payload = {
+        "encoding": encoding,
+        "dtype": arr.dtype.str,
+        "shape": list(arr.shape),
+    }
+    if encoding == "base64":
+        payload["data"] = base64.b64encode(arr.tobytes()).decode("ascii")
+    elif encoding == "npy":
+        buf = io.BytesIO()
+        np.save(buf, arr, allow_pickle=False)
+        payload["data"] = base64.b64encode(buf.getvalue()).decode("ascii")
+    elif encoding == "list":
+        payload["data"] = arr.ravel().tolist()
+        if arr.dtype.kind == "f" and not np.isfinite(arr).all():
+            # JSON has no NaN or infinity; they travel as null
+            payload["data"] = [value if math.isfinite(value) else None for value in payload["data"]]
+    elif encoding == "delta":
+        if arr.dtype.kind not in "iuf":
+            raise ValueError("Delta encoding needs a real-valued array")
+        flat = arr.ravel().astype(float)
+        scale = 10.0 ** decimals
+        finite = np.isfinite(flat)
+        if np.any(np.abs(flat[finite]) >= 2.0 ** 53 / scale):
+            # Too large to quantize exactly at this precision; never drop finite data
+            return encode_array(arr, encoding="list")
+        # Gaps repeat the previous value so they cost a zero delta
+        filled = flat
+        if not finite.all():
+            index = np.where(finite, np.arange(flat.size), 0)
+            np.maximum.accumulate(index, out=index)
+            filled = np.where(finite[index], flat[index], 0.0)
+        quantized = np.round(filled * scale).astype(np.int64)
+        payload["decimals"] = decimals
+        payload["data"] = np.diff(quantized, prepend=0).tolist()
+        payload["gaps"] = np.flatnonzero(~finite).tolist()
+    else:
+        raise ValueError(f"Unsupported array encoding: {encoding}")
+    return payload
+
+
+def decode_array(payload: Dict[str, Any]) -> np.ndarray:
+    """Decode a payload produced by encode_array back into a NumPy array."""
+    encoding = payload.get("encoding", "base64")
+    if encoding == "npy":
+        return np.load(io.BytesIO(base64.b64decode(payload["data"])), allow_pickle=False)
+    dtype = np.dtype(payload.get("dtype", "<f8"))
+    if encoding == "base64":
+        arr = np.frombuffer(base64.b64decode(payload["data"]), dtype=dtype)
+    elif encoding == "list":
+        arr = np.asarray(payload["data"], dtype=dtype)
+    elif encoding == "delta":
+        arr = np.cumsum(np.asarray(payload["data"], dtype=np.int64)) / 10.0 ** payload.get("decimals", 6)
+        arr[np.asarray(payload.get("gaps", []), dtype=np.int64)] = np.nan
+        arr = arr.astype(dtype, copy=False)
+    else:
+        raise ValueError(f"Unsupported array encoding: {encoding}")
+    shape = payload.get("shape")
+    return arr.reshape(shape) if shape is not None else arr
@@ -0,0 +1,344 @@
+"""
+Safe expression compilation shared by the compute and graph routers.
+
+An expression is parsed into an AST once and checked against a whitelist
+of node types and function names. Constant subexpressions such as
+``2*pi/3`` or ``sqrt(2)`` are folded at compile time, and the tree is
+compiled into a function of its free variables that evaluates with NumPy,
+so the same compiled expression serves a scalar compute request and a
+vectorized plot grid alike.
+"""
+import ast
+import math
+import operator
+from typing import Any, Callable, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.cache import LRUCache
+from app.config import settings
+
+# Functions callable from expressions
+FUNCTIONS = {
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "asin": np.arcsin,
+    "acos": np.arccos,
+    "atan": np.arctan,
+    "sinh": np.sinh,
+    "cosh": np.cosh,
+    "tanh": np.tanh,
+    "asinh": np.arcsinh,
+    "acosh": np.arccosh,
+    "atanh": np.arctanh,
+    "log": np.log10,
+    "ln": np.log,
+    "log2": np.log2,
+    "exp": np.exp,
+    "sqrt": np.sqrt,
+    "abs": np.abs,
+    "pow": np.power,
+    "factorial": math.factorial,
+    "degrees": np.degrees,
+    "radians": np.radians,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "round": np.round,
+}
+
+CONSTANTS = {
+    "pi": np.pi,
+    "e": np.e,
+}
+
+NAMESPACE = {**FUNCTIONS, **CONSTANTS}
+
+# Functions whose constant calls are left to run time (unbounded cost)
+_NO_FOLD = {"factorial"}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.List,
+    ast.Tuple,
+    ast.Subscript,
+    ast.Slice,
+    ast.MatMult,
+    ast.Not,
+    ast.And,
+    ast.Or,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    *_BINARY_OPERATORS,
+    *_UNARY_OPERATORS,
+)
+
+# Functions that act element by element, so an expression built only from
+# them and arithmetic can be evaluated on row blocks of its operands
+_ELEMENTWISE_FUNCTIONS = frozenset(FUNCTIONS) - {"factorial"}
+
+# Nodes whose result depends on an operand as a whole (indexing, matrix
+# products, literal sequences)
+_WHOLE_ARRAY_NODES = (ast.Subscript, ast.Slice, ast.MatMult, ast.List, ast.Tuple)
+
+# Compiled expressions keyed by normalized text and shadowed names
+expression_cache = LRUCache(maxsize=settings.EXPRESSION_CACHE_SIZE)
+
+
+def normalize_expression(expr: str) -> str:
+    """Rewrite constant symbols and ``^`` and collapse whitespace so equivalent inputs share a cache key."""
+    expr = " ".join(expr.split())
+    # ^ is rewritten in the text, not the tree, so it keeps the precedence of **
+    return expr.replace("π", "pi").replace("τ", "(2*pi)").replace("^", "**")
+
+
+class _Validator(ast.NodeVisitor):
+    def generic_visit(self, node: ast.AST) -> None:
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in expression: {type(node).__name__}")
+        super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id.startswith("__"):
+            raise ValueError(f"Invalid name in expression: {node.id}")
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if not isinstance(node.value, (int, float, complex)):
+            raise ValueError("Only numeric literals are allowed in expressions")
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            name = node.func.id if isinstance(node.func, ast.Name) else type(node.func).__name__
+            raise ValueError(f"Unknown function: {name}")
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise ValueError("Functions take positional arguments only")
+        for arg in node.args:
+            self.visit(arg)
+
+
+def parse_expression(expr: str) -> ast.Expression:
+    """Parse a normalized expression and check it against the whitelist."""
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    _Validator().visit(tree)
+    return tree
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, complex)) and not isinstance(value, bool)
+
+
+class _ConstantFolder(ast.NodeTransformer):
+    def __init__(self, shadowed: FrozenSet[str]):
+        self.shadowed = shadowed
+
+    def _constant(self, value: Any, node: ast.AST) -> ast.AST:
+        if isinstance(value, np.generic):
+            value = value.item()
+        if not _is_number(value):
+            return node
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in CONSTANTS and node.id not in self.shadowed:
+            return self._constant(CONSTANTS[node.id], node)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        op = _BINARY_OPERATORS.get(type(node.op))
+        if op is None or not (isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant)):
+            return node
+        left, right = node.left.value, node.right.value
+        if op is operator.pow and isinstance(left, int) and isinstance(right, int) and abs(right) > 64:
+            # Leave huge integer powers to run time rather than blocking the compile
+            return node
+        try:
+            return self._constant(op(left, right), node)
+        except (ArithmeticError, ValueError, TypeError):
+            # Let the error surface at evaluation time as it always has
+            return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        op = _UNARY_OPERATORS.get(type(node.op))
+        if op is None or not isinstance(node.operand, ast.Constant):
+            return node
+        return self._constant(op(node.operand.value), node)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        self.generic_visit(node)
+        name = node.func.id
+        if name in _NO_FOLD or name in self.shadowed or not all(isinstance(arg, ast.Constant) for arg in node.args):
+            return node
+        try:
+            with np.errstate(all="ignore"):
+                return self._constant(FUNCTIONS[name](*(arg.value for arg in node.args)), node)
+        except (ArithmeticError, ValueError, TypeError):
+            return node
+
+
+class CompiledExpression:
+    """A folded, compiled expression called with a mapping of variable values.
+
+    ``elementwise`` is True when every element of the result depends only
+    on the same elements of the operands, i.e. it is safe to chunk.
+    """
+
+    __slots__ = ("source", "names", "function", "elementwise")
+
+    def __init__(self, source: str, names: Tuple[str, ...], function: Callable[..., Any], elementwise: bool = True):
+        self.source = source
+        self.names = names
+        self.function = function
+        self.elementwise = elementwise
+
+    def __call__(self, variables: Mapping[str, Any]) -> Any:
+        args = []
+        for name in self.names:
+            if name not in variables:
+                raise NameError(f"name '{name}' is not defined")
+            args.append(variables[name])
+        return self.function(*args)
+
+
+_GLOBALS = {"__builtins__": {}, **NAMESPACE}
+
+
+def _compile(source: str, shadowed: FrozenSet[str]) -> CompiledExpression:
+    tree = _ConstantFolder(shadowed).visit(parse_expression(source))
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    names = tuple(sorted(name for name in used if name not in NAMESPACE or name in shadowed))
+    function = ast.Expression(
+        body=ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=name) for name in names],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=tree.body,
+        )
+    )
+    code = compile(ast.fix_missing_locations(function), "<expression>", "eval")
+    return CompiledExpression(source, names, eval(code, _GLOBALS), _is_elementwise(tree))
+
+
+def _is_elementwise(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, _WHOLE_ARRAY_NODES):
+            return False
+        if isinstance(node, ast.Call) and node.func.id not in _ELEMENTWISE_FUNCTIONS:
+            return False
+    return True
+
+
+def compile_expression(expr: str, bound: Iterable[str] = ()) -> CompiledExpression:
+    """
+    Return the compiled form of ``expr``, using the LRU cache.
+
+    ``bound`` names the variables the caller will supply; any that shadow
+    a built-in constant or function are left unfolded so the variable wins.
+    """
+    source = normalize_expression(expr)
+    shadowed = frozenset(NAMESPACE.keys() & set(bound))
+    return expression_cache.get_or_create((source, shadowed), lambda: _compile(source, shadowed))
+
+
+def expression_components(expr: str) -> Tuple[str, ...]:
+    """Split a comma-separated expression such as ``cos(t), sin(t)`` into its parts."""
+    tree = parse_expression(normalize_expression(expr))
+    if isinstance(tree.body, ast.Tuple):
+        return tuple(ast.unparse(element) for element in tree.body.elts)
+    return (ast.unparse(tree.body),)
+
+
+def _block(value: Any, start: int, stop: int, ndim: int) -> Any:
+    # Only operands that span the result's first axis are sliced
+    if np.ndim(value) == ndim and np.shape(value)[0] > 1:
+        return value[start:stop]
+    return value
+
+
+def evaluate_chunked(
+    compiled: CompiledExpression,
+    variables: Mapping[str, Any],
+    shape: Tuple[int, ...],
+    dtype: Optional[Any] = None,
+    chunk_elements: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Evaluate ``compiled`` over broadcastable variables in fixed-size blocks.
+
+    The result of ``shape`` is filled along its first axis about
+    ``chunk_elements`` elements at a time, so intermediate arrays never
+    exceed one block however large the grid. Pass grid axes as broadcastable
+    vectors (e.g. ``x[None, :]`` and ``y[:, None]``) rather than a meshgrid.
+    With ``dtype`` (e.g. float32) floating inputs are cast first so the
+    whole computation runs at that precision. Expressions that are not
+    elementwise (e.g. ``x - x[0]``) are evaluated in one piece, since a
+    block of rows would change their result.
+    """
+    chunk_elements = chunk_elements or settings.EVAL_CHUNK_ELEMENTS
+    if dtype is not None:
+        dtype = np.dtype(dtype)
+    bound = {}
+    for name in compiled.names:
+        if name not in variables:
+            raise NameError(f"name '{name}' is not defined")
+        value = variables[name]
+        if dtype is not None and isinstance(value, np.ndarray) and value.dtype.kind == "f":
+            value = value.astype(dtype, copy=False)
+        bound[name] = value
+
+    if not shape:
+        return np.asarray(compiled(bound), dtype=dtype)
+    if not compiled.elementwise:
+        values = np.asarray(compiled(bound))
+        values = values.astype(dtype or np.result_type(values.dtype, np.float64), copy=False)
+        if values.shape != shape and np.broadcast_shapes(values.shape, shape) == shape:
+            values = np.broadcast_to(values, shape).copy()
+        return values
+    rows = max(1, chunk_elements // max(math.prod(shape[1:]), 1))
+    out = None
+    for start in range(0, shape[0], rows):
+        stop = min(start + rows, shape[0])
+        block = {name: _block(value, start, stop, len(shape)) for name, value in bound.items()}
+        values = np.broadcast_to(compiled(block), (stop - start, *shape[1:]))
+        if out is None:
+            out = np.empty(shape, dtype=dtype or np.result_type(values.dtype, np.float64))
+        out[start:stop] = values
+    if out is None:
+        out = np.empty(shape, dtype=dtype or np.float64)
+    return out
@@ -0,0 +1,109 @@
+"""
+Cached matrix factorizations for session variables.
+
+Solving ``A x = b`` against the same stored matrix with many right-hand
+sides only needs one O(n^3) factorization. LU, Cholesky and QR
+factorizations are cached per (session, variable name, content hash,
+method) and reused for solve/det/inv/lstsq; the session variable
+endpoints invalidate them when a variable changes.
+"""
+import hashlib
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+from app.cache import LRUCache
+from app.config import settings
+
+METHODS = ("lu", "cholesky", "qr")
+
+
+def _factorization_bytes(entry) -> int:
+    method, parts = entry
+    return sum(part.nbytes for part in parts if isinstance(part, np.ndarray))
+
+
+factorization_cache = LRUCache(
+    maxsize=settings.FACTORIZATION_CACHE_SIZE,
+    max_weight=settings.FACTORIZATION_CACHE_MAX_BYTES,
+    weigher=_factorization_bytes,
+)
+
+
+def content_hash(arr: np.ndarray) -> str:
+    """Hash an array's dtype, shape and data."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(arr.dtype).encode())
+    digest.update(str(arr.shape).encode())
+    digest.update(np.ascontiguousarray(arr).tobytes())
+    return digest.hexdigest()
+
+
+def _factorize(arr: np.ndarray, method: str):
+    import scipy.linalg
+
+    if method == "lu":
+        return method, scipy.linalg.lu_factor(arr)
+    if method == "cholesky":
+        return method, scipy.linalg.cho_factor(arr)
+    if method == "qr":
+        return method, np.linalg.qr(arr)
+    raise ValueError(f"Unsupported factorization: {method}")
+
+
+def get_factorization(arr: np.ndarray, method: str, key: Optional[Hashable] = None):
+    """
+    Return the ``method`` factorization of ``arr``.
+
+    ``key`` identifies the stored variable as ``(session_id, name)``; without
+    it the factorization is computed but not cached.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unsupported factorization: {method}")
+    if key is None:
+        return _factorize(arr, method)
+    cache_key = (*key, content_hash(arr), method)
+    return factorization_cache.get_or_create(cache_key, lambda: _factorize(arr, method))
+
+
+def invalidate_variable(session_id: int, name: str) -> int:
+    """Drop every cached factorization of a session variable."""
+    return factorization_cache.discard_matching(
+        lambda cache_key: cache_key[0] == session_id and cache_key[1] == name
+    )
+
+
+def solve(factorization, b: np.ndarray) -> np.ndarray:
+    import scipy.linalg
+
+    method, parts = factorization
+    if method == "lu":
+        return scipy.linalg.lu_solve(parts, b)
+    if method == "cholesky":
+        return scipy.linalg.cho_solve(parts, b)
+    q, r = parts
+    # Q is unitary for complex input, so its inverse is the conjugate transpose
+    return scipy.linalg.solve_triangular(r, q.conj().T @ b)
+
+
+def det(factorization) -> float:
+    method, parts = factorization
+    if method == "lu":
+        lu, piv = parts
+        swaps = np.count_nonzero(piv != np.arange(piv.size))
+        return (-1.0) ** swaps * np.prod(np.diag(lu))
+    if method == "cholesky":
+        c, _ = parts
+        return np.prod(np.diag(c)) ** 2
+    raise ValueError("Determinants need an LU or Cholesky factorization")
+
+
+def inv(factorization, n: int) -> np.ndarray:
+    return solve(factorization, np.eye(n))
+
+
+def lstsq(factorization, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, Any]:
+    """Least squares from a QR factorization of a full-column-rank ``a``."""
+    x = solve(factorization, b)
+    residuals = np.sum(np.abs(a @ x - b) ** 2, axis=0) if a.shape[0] > a.shape[1] else np.array([])
+    return x, residuals
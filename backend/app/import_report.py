@@ -0,0 +1,78 @@
+"""
+Startup import-cost report.
+
+Imports ``main`` in a fresh interpreter under ``python -X importtime`` and
+prints the modules with the highest cumulative import time, flagging any
+heavy numerical library that has crept back into the startup path:
+
+    python -m app.import_report --top 20 --budget-ms 1000
+
+Exits non-zero when the total exceeds ``--budget-ms`` or a heavy library
+is imported, so it can run as a CI check.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Libraries that endpoints import on first use, never at startup
+HEAVY_MODULES = ("sympy", "mpmath", "scipy.stats", "scipy.sparse", "pandas", "matplotlib.pyplot")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(module: str = "main") -> List[Tuple[str, int, int]]:
+    """Return ``(name, self_us, cumulative_us)`` for every module imported by ``module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def build_report(timings: List[Tuple[str, int, int]], module: str = "main", top: int = 20) -> Dict[str, object]:
+    cumulative = {name: cumulative_us for name, _, cumulative_us in timings}
+    slowest = sorted(timings, key=lambda timing: timing[2], reverse=True)[:top]
+    return {
+        "total_ms": cumulative.get(module, 0) / 1000,
+        "modules": [{"module": name, "self_ms": s / 1000, "cumulative_ms": c / 1000} for name, s, c in slowest],
+        "heavy_imports": [name for name in HEAVY_MODULES if name in cumulative],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    report = build_report(measure_imports(args.module), args.module, args.top)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for entry in report["modules"]:
+        print(f"{entry['cumulative_ms']:14.1f} {entry['self_ms']:9.1f}  {entry['module']}")
+    print(f"\nimport {args.module}: {report['total_ms']:.1f} ms")
+
+    status = 0
+    if report["heavy_imports"]:
+        print(f"heavy libraries imported at startup: {', '.join(report['heavy_imports'])}")
+        status = 1
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"over budget: {report['total_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
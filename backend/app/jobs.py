@@ -0,0 +1,204 @@
+"""
+Asynchronous CAS jobs.
+
+Long symbolic computations are submitted as jobs, polled for status and
+fetched once finished, so no HTTP request has to outlive the load
+balancer timeout. Two backends are available, selected by
+``settings.JOB_BACKEND``: ``memory`` runs jobs on a thread pool in this
+process (no Redis needed), ``celery`` dispatches them to Celery workers.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are pending or running."""
+
+
+class _Job:
+    def __init__(self, operation: str, expr: str, options: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.operation = operation
+        self.expr = expr
+        self.options = options
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "operation": self.operation,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class InProcessJobBackend:
+    """
+    Runs jobs on a local thread pool that feeds the CAS process pool.
+
+    ``runner(operation, expr, options, cancel_event=...)`` does the actual
+    work. Finished jobs are dropped once they are older than ``ttl``.
+    """
+
+    def __init__(self, runner: Callable, max_workers: int, max_jobs: int, ttl: float):
+        self.runner = runner
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cas-job")
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, operation: str, expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        self.cleanup()
+        job = _Job(operation, expr, options)
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status not in FINISHED_STATES)
+            if active >= self.max_jobs:
+                raise JobQueueFullError("Too many CAS jobs in progress, try again later")
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job.describe()
+
+    def _run(self, job: _Job) -> None:
+        if job.cancel_event.is_set():
+            return
+        job.status = RUNNING
+        try:
+            job.result = self.runner(job.operation, job.expr, job.options, cancel_event=job.cancel_event)
+            job.status = SUCCEEDED
+        except Exception as e:
+            job.error = str(e)
+            job.status = CANCELLED if job.cancel_event.is_set() else FAILED
+        job.finished_at = time.time()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._get(job_id)
+        return job.describe() if job else None
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._get(job_id)
+        if job is None:
+            return None
+        return dict(job.describe(), result=job.result)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED_STATES:
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                # Never started, so nothing else will mark it finished
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        return job.describe()
+
+    def cleanup(self) -> None:
+        """Drop finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.status in FINISHED_STATES and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _get(self, job_id: str) -> Optional[_Job]:
+        self.cleanup()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Celery task states mapped onto job states
+_CELERY_STATES = {
+    "PENDING": PENDING,
+    "RECEIVED": PENDING,
+    "RETRY": PENDING,
+    "STARTED": RUNNING,
+    "SUCCESS": SUCCEEDED,
+    "FAILURE": FAILED,
+    "REVOKED": CANCELLED,
+}
+
+
+class CeleryJobBackend:
+    """Dispatches jobs to Celery workers; see app.celery_app for the task."""
+
+    def __init__(self):
+        from app.celery_app import celery_app, run_cas_operation
+
+        self.app = celery_app
+        self.task = run_cas_operation
+
+    def submit(self, operation: str, expr: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        async_result = self.task.apply_async(args=(operation, expr, options))
+        return {"job_id": async_result.id, "operation": operation, "status": PENDING}
+
+    def _describe(self, async_result) -> Dict[str, Any]:
+        status = _CELERY_STATES.get(async_result.state, PENDING)
+        return {
+            "job_id": async_result.id,
+            "status": status,
+            "error": str(async_result.result) if status == FAILED else None,
+        }
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._describe(self.app.AsyncResult(job_id))
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async_result = self.app.AsyncResult(job_id)
+        info = self._describe(async_result)
+        info["result"] = async_result.result if info["status"] == SUCCEEDED else None
+        return info
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async_result = self.app.AsyncResult(job_id)
+        async_result.revoke(terminate=True, signal="SIGKILL")
+        return self._describe(async_result)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def create_job_backend(runner: Callable):
+    """Build the job backend configured by ``settings.JOB_BACKEND``."""
+    if settings.JOB_BACKEND == "celery":
+        return CeleryJobBackend()
+    if settings.JOB_BACKEND != "memory":
+        raise ValueError(f"Unsupported job backend: {settings.JOB_BACKEND}")
+    return InProcessJobBackend(
+        runner=runner,
+        max_workers=settings.CAS_WORKERS,
+        max_jobs=settings.CAS_JOB_QUEUE_SIZE,
+        ttl=settings.CAS_JOB_TTL_SECONDS,
+    )
@@ -0,0 +1,254 @@
+"""
+Structured matrix operations.
+
+Operands arrive as typed arrays (nested JSON numbers, an encoded payload
+from app.encoding, or a sparse triplet spec from app.sparse) rather than
+NumPy source text, and results go back in the same encoding, so large
+matrices never pass through the Python parser or SymPy.
+"""
+from functools import reduce
+from typing import Any, Dict, Hashable, List, Optional, Union
+
+import numpy as np
+
+from app import factorization
+from app.config import settings
+from app.encoding import decode_array, encode_array
+from app.sparse import decode_sparse, encode_sparse, is_sparse, is_sparse_spec, run_sparse_operation
+
+OperandSpec = Union[List[Any], Dict[str, Any]]
+
+# Number of operands each operation takes (None means two or more)
+OPERATION_ARITY = {
+    "inv": 1,
+    "det": 1,
+    "eig": 1,
+    "svd": 1,
+    "solve": 2,
+    "lstsq": 2,
+    "matmul": None,
+    "eigsh": 1,
+}
+
+
+def operand_encoding(spec: OperandSpec) -> str:
+    """Return the wire encoding of an operand: ``json`` or the payload encoding."""
+    if isinstance(spec, dict) and "variable" in spec:
+        return "json"
+    if is_sparse_spec(spec):
+        return operand_encoding(spec["data"])
+    if isinstance(spec, dict):
+        return spec.get("encoding", "base64")
+    return "json"
+
+
+def decode_variable_value(value_json: Dict[str, Any]) -> np.ndarray:
+    """
+    Decode a session variable's ``value_json`` into an array.
+
+    Accepts an encoded array payload, a sparse triplet spec or
+    ``{"value": <nested numbers>}``.
+    """
+    if is_sparse_spec(value_json):
+        return decode_sparse(value_json)
+    if "encoding" in value_json and "data" in value_json:
+        return decode_array(value_json)
+    if "value" in value_json:
+        return np.asarray(value_json["value"])
+    raise ValueError("Variable does not hold an array value")
+
+
+def decode_operand(spec: OperandSpec):
+    """Decode an operand into a float (or complex) NumPy array or a sparse matrix."""
+    if is_sparse_spec(spec):
+        return decode_sparse(spec)
+    if isinstance(spec, dict):
+        arr = decode_array(spec)
+    else:
+        arr = np.asarray(spec)
+    return _check_operand(arr)
+
+
+def _check_operand(arr):
+    if is_sparse(arr):
+        return arr
+    if arr.dtype.kind not in "iufc":
+        raise ValueError("Matrix operands must be numeric")
+    if arr.size > settings.MAX_MATRIX_ELEMENTS:
+        raise ValueError(f"Matrix operands are limited to {settings.MAX_MATRIX_ELEMENTS} elements")
+    if arr.dtype.kind != "c":
+        arr = arr.astype(float, copy=False)
+    return arr
+
+
+def encode_result(value: Any, encoding: str, sparse_format: str = "csr") -> Any:
+    """Encode an array (or sparse matrix) result in the requested wire encoding."""
+    if is_sparse(value):
+        return encode_sparse(value, sparse_format, lambda arr: encode_result(arr, encoding))
+    arr = np.asarray(value)
+    if encoding == "json":
+        if arr.ndim == 0:
+            return complex(arr) if arr.dtype.kind == "c" else float(arr)
+        if arr.dtype.kind == "c":
+            return {"real": arr.real.tolist(), "imag": arr.imag.tolist()}
+        return arr.tolist()
+    return encode_array(arr, encoding=encoding)
+
+
+def matrix_latex(value: Any) -> str:
+    """Render a scalar, vector or 2-d array as LaTeX without SymPy."""
+    arr = np.asarray(value)
+    if arr.ndim == 0:
+        return format(arr.item(), ".6g")
+    if arr.ndim == 1:
+        arr = arr.reshape(-1, 1)
+    if arr.ndim != 2:
+        return f"\\text{{array of shape {arr.shape}}}"
+    rows = " \\\\ ".join(" & ".join(format(item, ".6g") for item in row) for row in arr.tolist())
+    return f"\\left[\\begin{{matrix}}{rows}\\end{{matrix}}\\right]"
+
+
+def _square(arr: np.ndarray, operation: str) -> np.ndarray:
+    if arr.ndim != 2 or arr.shape[0] != arr.shape[1]:
+        raise ValueError(f"{operation} requires a square matrix, got shape {arr.shape}")
+    return arr
+
+
+def _run_factored(operation: str, operands: List[np.ndarray], key: Hashable, method: Optional[str]):
+    """Run solve/det/inv/lstsq through a cached factorization of the first operand."""
+    a = operands[0]
+    if operation == "lstsq":
+        if a.ndim != 2 or a.shape[0] < a.shape[1]:
+            return None
+        factored = factorization.get_factorization(a, "qr", key)
+        r = factored[1][1]
+        if np.min(np.abs(np.diag(r))) <= np.finfo(float).eps * max(a.shape) * np.max(np.abs(np.diag(r))):
+            # Rank deficient: QR least squares is not reliable
+            return None
+        solution, residuals = factorization.lstsq(factored, a, operands[1])
+        return {
+            "solution": solution,
+            "residuals": residuals,
+            "rank": np.asarray(a.shape[1], dtype=float),
+            # A and R share singular values, and R is only n x n
+            "singular_values": np.linalg.svd(r, compute_uv=False),
+        }
+
+    _square(a, operation)
+    if method is None or (operation == "det" and method == "qr"):
+        method = "lu"
+    factored = factorization.get_factorization(a, method, key)
+    if operation == "solve":
+        return {"result": factorization.solve(factored, operands[1])}
+    if operation == "det":
+        return {"result": factorization.det(factored)}
+    return {"result": factorization.inv(factored, a.shape[0])}
+
+
+def run_matrix_operation(
+    operation: str,
+    operands: List[np.ndarray],
+    keys: Optional[List[Optional[Hashable]]] = None,
+    method: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run a named linear-algebra operation.
+
+    ``keys`` gives a cache key for operands that are stored session
+    variables; when the first operand has one, solve/det/inv/lstsq reuse
+    its cached ``method`` factorization. Returns a dict of named array
+    results; single-result operations use the key ``result``.
+    """
+    if operation not in OPERATION_ARITY:
+        raise ValueError(f"Unsupported matrix operation: {operation}")
+    arity = OPERATION_ARITY[operation]
+    if arity is None and len(operands) < 2:
+        raise ValueError(f"{operation} requires at least two operands")
+    if arity is not None and len(operands) != arity:
+        raise ValueError(f"{operation} requires {arity} operand(s), got {len(operands)}")
+
+    if keys and keys[0] is not None and operation in ("solve", "det", "inv", "lstsq"):
+        outputs = _run_factored(operation, operands, keys[0], method)
+        if outputs is not None:
+            return outputs
+
+    if operation == "inv":
+        return {"result": np.linalg.inv(_square(operands[0], operation))}
+    if operation == "det":
+        return {"result": np.linalg.det(_square(operands[0], operation))}
+    if operation == "solve":
+        return {"result": np.linalg.solve(_square(operands[0], operation), operands[1])}
+    if operation == "eig":
+        values, vectors = np.linalg.eig(_square(operands[0], operation))
+        return {"values": values, "vectors": vectors}
+    if operation == "eigsh":
+        values, vectors = np.linalg.eigh(_square(operands[0], operation))
+        return {"values": values, "vectors": vectors}
+    if operation == "svd":
+        u, s, vt = np.linalg.svd(operands[0], full_matrices=False)
+        return {"u": u, "s": s, "vt": vt}
+    if operation == "lstsq":
+        solution, residuals, rank, singular_values = np.linalg.lstsq(operands[0], operands[1], rcond=None)
+        return {
+            "solution": solution,
+            "residuals": residuals,
+            "rank": np.asarray(rank, dtype=float),
+            "singular_values": singular_values,
+        }
+    return {"result": reduce(np.matmul, operands)}
+
+
+def evaluate_matrix_request(
+    operation: str,
+    operands: List[OperandSpec],
+    options: Dict[str, Any],
+    variables: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Decode operands, run the operation and encode the response.
+
+    An operand ``{"variable": name}`` refers to a session variable;
+    ``variables`` maps such names to ``(array, cache_key)`` pairs.
+    """
+    if not operands:
+        raise ValueError("At least one operand is required")
+    variables = variables or {}
+    arrays, keys = [], []
+    for spec in operands:
+        if isinstance(spec, dict) and "variable" in spec:
+            if spec["variable"] not in variables:
+                raise ValueError(f"Unknown session variable: {spec['variable']}")
+            arr, key = variables[spec["variable"]]
+            arrays.append(_check_operand(arr))
+            keys.append(key)
+        else:
+            arrays.append(decode_operand(spec))
+            keys.append(None)
+    encoding = options.get("encoding") or operand_encoding(operands[0])
+    sparse_specs = [spec for spec in operands if is_sparse_spec(spec)]
+    sparse_format = sparse_specs[0]["format"] if sparse_specs else "csr"
+
+    if any(is_sparse(arr) for arr in arrays):
+        if operation not in OPERATION_ARITY:
+            raise ValueError(f"Unsupported matrix operation: {operation}")
+        outputs = run_sparse_operation(operation, arrays, options)
+    else:
+        outputs = run_matrix_operation(operation, arrays, keys, options.get("factorization"))
+
+    if set(outputs) == {"result"}:
+        value = outputs["result"]
+        result = encode_result(value, encoding, sparse_format)
+        if is_sparse(value):
+            result_type = "sparse_matrix"
+        else:
+            result_type = "number" if np.ndim(value) == 0 else "matrix"
+    else:
+        value = None
+        result = {name: encode_result(output, encoding, sparse_format) for name, output in outputs.items()}
+        result_type = "decomposition"
+
+    # LaTeX only for small dense single results; large matrices are never rendered
+    latex = None
+    if value is not None and not is_sparse(value) and np.size(value) <= settings.MATRIX_LATEX_MAX_ELEMENTS:
+        latex = matrix_latex(value)
+    return {"result": result, "latex": latex, "type": result_type}
@@ -74,7 +74,7 @@ class Graph(Base):
     type = Column(String)  # 2d, parametric, polar, 3d
     expression = Column(String)
     parameters = Column(JSON)  # domain, range, etc.
-    image_data = Column(Text, nullable=True)  # Base64 encoded image
+    image_data = Column(Text, nullable=True)  # "blob:<name>" reference into the blob store
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -0,0 +1,120 @@
+"""
+Arbitrary-precision evaluation with mpmath.
+
+Each precision level gets its own ``MPContext`` and function namespace,
+built once and cached, so requests never reconfigure mpmath's global
+``mp.dps`` and constants such as pi and e are evaluated once per level.
+Numeric literals are rewritten to ``mpf("...")`` calls at compile time so
+``0.1`` means one tenth at the requested precision, not the nearest float.
+"""
+import ast
+from collections import ChainMap
+from typing import Any, Dict, Mapping
+
+import mpmath
+
+from app.cache import LRUCache
+from app.config import settings
+from app.expressions import parse_expression
+
+# One context and namespace per precision level (in decimal digits)
+context_cache = LRUCache(maxsize=settings.MAX_PRECISION)
+
+# Compiled expressions with literals rewritten, keyed by normalized text
+precise_code_cache = LRUCache(maxsize=settings.EXPRESSION_CACHE_SIZE)
+
+
+def resolve_precision(requested: Any = None) -> int:
+    """Return the requested precision in digits, capped at MAX_PRECISION."""
+    if requested is None:
+        return settings.DEFAULT_PRECISION
+    precision = int(requested)
+    if precision < 1:
+        raise ValueError("Precision must be at least 1 digit")
+    return min(precision, settings.MAX_PRECISION)
+
+
+def _build_namespace(dps: int) -> Dict[str, Any]:
+    ctx = mpmath.MPContext()
+    ctx.dps = dps
+    return {
+        "__context__": ctx,
+        "mpf": ctx.mpf,
+        "sin": ctx.sin,
+        "cos": ctx.cos,
+        "tan": ctx.tan,
+        "asin": ctx.asin,
+        "acos": ctx.acos,
+        "atan": ctx.atan,
+        "sinh": ctx.sinh,
+        "cosh": ctx.cosh,
+        "tanh": ctx.tanh,
+        "asinh": ctx.asinh,
+        "acosh": ctx.acosh,
+        "atanh": ctx.atanh,
+        "log": ctx.log10,
+        "ln": ctx.ln,
+        "log2": lambda x: ctx.log(x, 2),
+        "exp": ctx.exp,
+        "sqrt": ctx.sqrt,
+        "abs": ctx.fabs,
+        "pow": ctx.power,
+        # Constants are materialized once at this precision
+        "pi": +ctx.pi,
+        "e": +ctx.e,
+        "factorial": ctx.factorial,
+        "degrees": ctx.degrees,
+        "radians": ctx.radians,
+        "floor": ctx.floor,
+        "ceil": ctx.ceil,
+        "round": ctx.nint,
+    }
+
+
+def precise_namespace(dps: int) -> Dict[str, Any]:
+    """Return the cached function namespace for a precision level."""
+    return context_cache.get_or_create(dps, lambda: _build_namespace(dps))
+
+
+class _LiteralToMpf(ast.NodeTransformer):
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            call = ast.Call(
+                func=ast.Name(id="mpf", ctx=ast.Load()),
+                args=[ast.Constant(value=repr(node.value))],
+                keywords=[],
+            )
+            return ast.copy_location(call, node)
+        return node
+
+
+def compile_precise(expr: str):
+    """Compile a normalized expression with numeric literals wrapped in mpf()."""
+
+    def _compile():
+        # Validated like standard mode, but never constant-folded in floats
+        tree = _LiteralToMpf().visit(parse_expression(expr))
+        return compile(ast.fix_missing_locations(tree), "<expression>", "eval")
+
+    return precise_code_cache.get_or_create(expr, _compile)
+
+
+def evaluate_precise(expr: str, variables: Mapping[str, Any], dps: int) -> Dict[str, Any]:
+    """Evaluate a normalized expression at ``dps`` significant digits."""
+    namespace = precise_namespace(dps)
+    ctx = namespace["__context__"]
+    bound = {
+        name: ctx.mpf(str(value)) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+        for name, value in variables.items()
+    }
+    result = eval(compile_precise(expr), {"__builtins__": {}}, ChainMap(bound, namespace))
+    if isinstance(result, ctx.mpc):
+        result_type = "complex"
+    elif isinstance(result, (ctx.mpf, int)):
+        result_type = "number"
+    else:
+        raise ValueError("Precise mode only supports scalar results")
+    return {
+        "result": ctx.nstr(result, dps),
+        "type": result_type,
+    }
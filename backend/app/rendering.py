@@ -0,0 +1,248 @@
+"""
+Render pool for matplotlib figures.
+
+pyplot keeps the current figure in global state, so concurrent requests
+drawing through it can end up on each other's axes. Figures are instead
+built with the object-oriented ``Figure`` API on an Agg canvas, and every
+render runs in a bounded pool of worker processes, so renders proceed in
+parallel on separate cores and never block the event loop. Work beyond the
+pool and its queue is rejected instead of piling up.
+"""
+import asyncio
+import io
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+
+class RenderBusyError(Exception):
+    """Raised when the render queue is full."""
+
+
+class RenderTimeoutError(Exception):
+    """Raised when a render runs past its timeout."""
+
+
+class RenderWorkerError(RenderBusyError):
+    """Raised when a render worker dies; the pool is rebuilt, so a retry can succeed."""
+
+
+# Image formats figures can be saved as, with their media types
+IMAGE_MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+# The historical 10x6 inch figure at 100 DPI
+DEFAULT_WIDTH = 1000
+DEFAULT_HEIGHT = 600
+DEFAULT_DPI = 100
+
+
+class ImageOptions(NamedTuple):
+    format: str = "png"
+    width: int = DEFAULT_WIDTH  # pixels
+    height: int = DEFAULT_HEIGHT
+    dpi: int = DEFAULT_DPI
+
+    @property
+    def figsize(self) -> Tuple[float, float]:
+        return self.width / self.dpi, self.height / self.dpi
+
+    @property
+    def media_type(self) -> str:
+        return IMAGE_MEDIA_TYPES[self.format]
+
+
+def image_options(options: Optional[Dict[str, Any]] = None) -> ImageOptions:
+    """Validate the ``format``, ``width``, ``height`` and ``dpi`` a client asked for.
+
+    Missing values fall back to a 1000x600 PNG at 100 DPI; with only a
+    width the height keeps that 5:3 aspect ratio.
+    """
+    options = options or {}
+    fmt = str(options.get("format") or "png").lower()
+    if fmt not in IMAGE_MEDIA_TYPES:
+        raise ValueError(f"Unsupported image format: {fmt} (use {', '.join(IMAGE_MEDIA_TYPES)})")
+    try:
+        width = int(options.get("width") or DEFAULT_WIDTH)
+        height = int(options.get("height") or round(width * DEFAULT_HEIGHT / DEFAULT_WIDTH))
+        dpi = int(options.get("dpi") or DEFAULT_DPI)
+    except (TypeError, ValueError):
+        raise ValueError("Image width, height and dpi must be integers")
+    if not (16 <= width <= settings.IMAGE_MAX_SIDE and 16 <= height <= settings.IMAGE_MAX_SIDE):
+        raise ValueError(f"Image width and height must be between 16 and {settings.IMAGE_MAX_SIDE} pixels")
+    if not 10 <= dpi <= settings.IMAGE_MAX_DPI:
+        raise ValueError(f"Image dpi must be between 10 and {settings.IMAGE_MAX_DPI}")
+    return ImageOptions(fmt, width, height, dpi)
+
+
+def accepts_image(accept: Optional[str], media_type: str) -> bool:
+    """Whether an Accept header asks for raw image bytes rather than JSON.
+
+    Only an explicit image type (or ``image/*``) without JSON counts, so
+    clients sending the usual ``*/*`` keep getting JSON.
+    """
+    if not accept:
+        return False
+    accepted = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    return "application/json" not in accepted and bool(accepted & {media_type, "image/*"})
+
+
+def new_figure(figsize: Tuple[float, float] = (10, 6)):
+    """Return a standalone Figure with an Agg canvas, untouched by pyplot."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_bytes(fig, fmt: str = "png", dpi: int = DEFAULT_DPI, transparent: bool = False) -> bytes:
+    """Render a figure to image bytes."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, transparent=transparent)
+    return buf.getvalue()
+
+
+class RenderPool:
+    """Bounded pool of rendering processes with queue-depth counters."""
+
+    def __init__(self, max_workers: int, max_queue: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Worker processes are spawned on first use, not at import
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # A worker that died (e.g. killed or out of memory) breaks the whole
+        # executor; drop it so the next render builds a fresh one
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """Queue ``func(*args)`` on a worker; raises RenderBusyError when full.
+
+        ``func`` must be a module-level function so it can be pickled.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RenderBusyError("Render pool is at capacity, try again later")
+        # A pool broken since the last render is replaced and the submit retried once
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                future = executor.submit(func, *args)
+                break
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    self._submit_failed()
+                    raise RenderWorkerError("Render worker exited unexpectedly, try again")
+            except Exception:
+                self._submit_failed()
+                raise
+        with self._lock:
+            self.pending += 1
+        future.add_done_callback(lambda done: self._finished(done, executor))
+        return future
+
+    def _submit_failed(self) -> None:
+        self._slots.release()
+        with self._lock:
+            self.failed += 1
+
+    def _finished(self, future: Future, executor: ProcessPoolExecutor) -> None:
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._discard(executor)
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled() or error is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Render on the pool and block the calling thread for the result."""
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._timed_out(future)
+        except BrokenProcessPool:
+            raise RenderWorkerError("Render worker exited unexpectedly, try again")
+
+    async def run_async(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Render on the pool without blocking the event loop."""
+        future = self.submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timed_out(future)
+        except BrokenProcessPool:
+            raise RenderWorkerError("Render worker exited unexpectedly, try again")
+
+    def _timed_out(self, future: Future) -> None:
+        # A render that has started cannot be interrupted; it finishes in the
+        # background and its slot is released when it does
+        future.cancel()
+        with self._lock:
+            self.timeouts += 1
+        raise RenderTimeoutError(f"Rendering exceeded {self.timeout} seconds")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                # Submitted renders not yet finished, and those waiting for a worker
+                "queue_depth": self.pending,
+                "waiting": max(self.pending - self.max_workers, 0),
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_pool = RenderPool(
+    max_workers=settings.RENDER_WORKERS,
+    max_queue=settings.RENDER_QUEUE_SIZE,
+    timeout=settings.RENDER_TIMEOUT_SECONDS,
+)
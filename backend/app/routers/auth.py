@@ -18,6 +18,7 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
 
 
 def verify_password(plain_password, hashed_password):
@@ -78,6 +79,19 @@ async def get_current_active_user(current_user: models.User = Depends(get_curren
     return current_user
 
 
+async def get_optional_current_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme), db: Session = Depends(get_db)
+):
+    """Return the authenticated active user, or None for anonymous requests."""
+    if not token:
+        return None
+    try:
+        user = await get_current_user(token=token, db=db)
+    except HTTPException:
+        return None
+    return user if user.is_active else None
+
+
 @router.post("/register", response_model=schemas.User)
 def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = get_user(db, email=user.email)
@@ -1,25 +1,182 @@
+import json
 import math
+import os
+import time
+from collections import ChainMap
+
 import numpy as np
-import sympy as sp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.database import get_db
-from app.routers.auth import get_current_active_user
+from app.routers.auth import get_optional_current_user
 from app.config import settings
+from app.cache import DiskCache, LRUCache, TwoTierCache
+from app.cas_executor import CASBusyError, CASCancelledError, CASTimeoutError, CASWorkerError, cas_executor
+from app.cas_keys import CANONICAL_KEY, LATEX, RESULT_SETTINGS, text_key
+from app.jobs import PENDING, RUNNING, JobQueueFullError, create_job_backend
+from app.encoding import decode_array, encode_array
+from app.expressions import compile_expression, evaluate_chunked, expression_cache, normalize_expression
+from app.factorization import factorization_cache
+from app.matrix import encode_result, evaluate_matrix_request, matrix_latex
+from app.session_context import context_array, load_session_context, session_context_cache
+from app.sparse import decode_sparse, is_sparse, is_sparse_spec
 
 router = APIRouter()
 
+# Parsed CAS-mode expressions and their lambdified NumPy callables
+cas_expression_cache = LRUCache(maxsize=settings.LAMBDIFY_CACHE_SIZE)
+lambdify_cache = LRUCache(maxsize=settings.LAMBDIFY_CACHE_SIZE)
+
+# LaTeX renderings keyed by normalized expression text
+latex_cache = LRUCache(maxsize=settings.LATEX_CACHE_SIZE)
+
+# CAS results keyed by operation, canonical input and result settings
+cas_result_cache = TwoTierCache(
+    memory=LRUCache(maxsize=settings.CAS_CACHE_SIZE),
+    disk=DiskCache(os.path.join(settings.CACHE_DIR, "cas_results.sqlite3")),
+    dumps=lambda value: json.dumps(value).encode("utf-8"),
+    loads=json.loads,
+)
+
+
+def render_latex(expr: str) -> str:
+    """Return the LaTeX form of an expression.
+
+    Sympifying user input is unbounded, so a cache miss is rendered on a
+    CAS worker under ``CAS_TIMEOUT_SECONDS``.
+    """
+    normalized = normalize_expression(expr)
+    return latex_cache.get_or_create(normalized, lambda: cas_executor.submit(LATEX, normalized, {}))
+
+
+def parse_cas_expression(expr: str):
+    """Sympify an expression once and reuse the parsed tree."""
+    import sympy as sp
+
+    return cas_expression_cache.get_or_create(expr, lambda: sp.sympify(expr))
+
+
+def _is_numeric_binding(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float, np.number, np.ndarray)):
+        return True
+    if isinstance(value, list):
+        return all(_is_numeric_binding(item) for item in value)
+    return False
+
+
+def evaluate_cas_numeric(expr: str, variables: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Evaluate a CAS-mode expression through a cached ``sp.lambdify`` callable.
+
+    Returns None when some free symbol is unbound or bound to something
+    other than numbers/arrays, or when the numeric result is not finite
+    and real, so the caller can fall back to symbolic substitution. The
+    LaTeX is of the substituted expression, as on the symbolic path; for
+    array results it is the expression itself.
+    """
+    import sympy as sp
+
+    sympy_expr = parse_cas_expression(expr)
+    if not isinstance(sympy_expr, sp.Expr):
+        return None
+    arg_names = tuple(sorted(symbol.name for symbol in sympy_expr.free_symbols))
+    if not all(name in variables and _is_numeric_binding(variables[name]) for name in arg_names):
+        return None
+
+    def _compile():
+        symbols = [sp.Symbol(name) for name in arg_names]
+        return sp.lambdify(symbols, sympy_expr, modules="numpy")
+
+    func = lambdify_cache.get_or_create((expr, arg_names), _compile)
+    try:
+        with np.errstate(all="ignore"):
+            result = func(*(np.asarray(variables[name], dtype=float) for name in arg_names))
+    except Exception:
+        return None
+    result = np.asarray(result)
+    if np.iscomplexobj(result) or not np.issubdtype(result.dtype, np.number):
+        return None
+    if not np.all(np.isfinite(result)):
+        # e.g. sqrt(-1) is nan in NumPy but I in SymPy
+        return None
+    if result.ndim == 0:
+        substituted = sympy_expr.subs({sp.Symbol(name): variables[name] for name in arg_names})
+        return {"result": float(result), "latex": sp.latex(substituted), "type": "number"}
+    return {"result": result.tolist(), "latex": sp.latex(sympy_expr), "type": "array"}
+
+
+def sweep_range(spec: Dict[str, Any]) -> np.ndarray:
+    """Materialize a ``{start, stop, num}`` or ``{start, stop, step}`` range binding."""
+    start = float(spec.get("start", 0))
+    stop = float(spec["stop"])
+    if "num" in spec:
+        num = int(spec["num"])
+    elif "step" in spec:
+        step = float(spec["step"])
+        if step == 0:
+            raise ValueError("Range step must be non-zero")
+        num = max(0, math.ceil((stop - start) / step))
+    else:
+        raise ValueError("Range bindings need either 'num' or 'step'")
+    if num > settings.MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep exceeds the limit of {settings.MAX_SWEEP_POINTS} points")
+    if "num" in spec:
+        return np.linspace(start, stop, num)
+    return np.arange(start, stop, step)
+
+
+def sweep_variables(variables: Dict[str, Any], grid: bool = False):
+    """
+    Materialize array and range bindings for a sweep.
+
+    Array-valued bindings broadcast against each other as given; with
+    ``grid`` each one-dimensional binding gets its own axis so the result
+    covers the outer product of all of them. Returns the bound variables
+    and the broadcast result shape.
+    """
+    swept = [name for name, value in variables.items() if isinstance(value, (list, dict))]
+    bound = {}
+    for name, value in variables.items():
+        if isinstance(value, dict) and "data" in value:
+            value = decode_array(value)
+        elif isinstance(value, dict):
+            value = sweep_range(value)
+        elif isinstance(value, list):
+            value = np.asarray(value, dtype=float)
+        if grid and name in swept and np.ndim(value) == 1:
+            shape = [1] * len(swept)
+            shape[swept.index(name)] = -1
+            value = value.reshape(shape)
+        bound[name] = value
+
+    shape = np.broadcast_shapes(*(np.shape(value) for value in bound.values()))
+    if math.prod(shape) > settings.MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep exceeds the limit of {settings.MAX_SWEEP_POINTS} points")
+    return bound, shape
+
 
 # Helper functions for computation
-def evaluate_expression(expr: str, variables: Dict[str, Any] = None, mode: str = "standard"):
-    """Evaluate a mathematical expression in the specified mode."""
+def evaluate_expression(
+    expr: str,
+    variables: Dict[str, Any] = None,
+    mode: str = "standard",
+    options: Optional[Dict[str, Any]] = None,
+):
+    """Evaluate a mathematical expression in the specified mode.
+
+    ``options`` carries the request settings used by individual modes.
+    """
     if variables is None:
         variables = {}
-    
+    if options is None:
+        options = {}
+
     # Helper function to convert NumPy types to Python native types
     def convert_numpy_types(obj):
         if isinstance(obj, np.integer):
@@ -37,45 +194,11 @@ def evaluate_expression(expr: str, variables: Dict[str, Any] = None, mode: str =
         
     try:
         if mode == "standard":
-            # Use numpy for standard calculations
-            # Replace common mathematical constants
-            expr = expr.replace("π", "pi").replace("τ", "2*pi").replace("e", "e")
-            
-            # Create a safe namespace with only allowed functions and constants
-            safe_dict = {
-                "sin": np.sin,
-                "cos": np.cos,
-                "tan": np.tan,
-                "asin": np.arcsin,
-                "acos": np.arccos,
-                "atan": np.arctan,
-                "sinh": np.sinh,
-                "cosh": np.cosh,
-                "tanh": np.tanh,
-                "asinh": np.arcsinh,
-                "acosh": np.arccosh,
-                "atanh": np.arctanh,
-                "log": np.log10,
-                "ln": np.log,
-                "log2": np.log2,
-                "exp": np.exp,
-                "sqrt": np.sqrt,
-                "abs": np.abs,
-                "pi": np.pi,
-                "e": np.e,
-                "factorial": math.factorial,
-                "degrees": np.degrees,
-                "radians": np.radians,
-                "floor": np.floor,
-                "ceil": np.ceil,
-                "round": np.round,
-            }
-            
-            # Add user variables to the namespace
-            safe_dict.update(variables)
-            
-            # Evaluate the expression
-            result = eval(expr, {"__builtins__": {}}, safe_dict)
+            # Use numpy for standard calculations, reusing the compiled
+            # expression when it has been seen before
+            compiled = compile_expression(expr, bound=variables.keys())
+            expr = compiled.source
+            result = compiled(variables)
             
             # Convert to Python native types for JSON serialization
             if isinstance(result, np.ndarray):
@@ -83,19 +206,57 @@ def evaluate_expression(expr: str, variables: Dict[str, Any] = None, mode: str =
             elif isinstance(result, np.number):
                 result = result.item()
             
-            # Generate LaTeX representation
-            latex = sp.latex(sp.sympify(expr))
-            
             return {
                 "result": result,
-                "latex": latex,
+                "latex": render_latex(expr) if options.get("latex") else None,
                 "type": "number" if isinstance(result, (int, float)) else "array"
             }
             
+        elif mode == "sweep":
+            # Evaluate over array/range bindings with NumPy broadcasting,
+            # in memory-bounded blocks, at float32 when dtype asks for it.
+            # Only names the expression uses are bound, so unrelated session
+            # arrays neither join the broadcast nor widen a grid
+            compiled = compile_expression(expr, bound=variables.keys())
+            expr = compiled.source
+            used = {name: variables[name] for name in compiled.names if name in variables}
+            bound, shape = sweep_variables(used, grid=options.get("grid", False))
+            result = evaluate_chunked(compiled, bound, shape, dtype=options.get("dtype"))
+            
+            return {
+                "result": encode_array(
+                    result,
+                    encoding=options.get("encoding", "base64"),
+                    dtype=options.get("dtype"),
+                ),
+                "latex": render_latex(expr) if options.get("latex") else None,
+                "type": "sweep"
+            }
+            
+        elif mode == "precise":
+            # Arbitrary-precision evaluation with mpmath at the requested digits
+            from app.precision import evaluate_precise, resolve_precision
+            
+            expr = normalize_expression(expr)
+            precise = evaluate_precise(expr, variables, resolve_precision(options.get("precision")))
+            return {
+                "result": precise["result"],
+                "latex": render_latex(expr) if options.get("latex") else None,
+                "type": precise["type"],
+            }
+            
         elif mode == "cas":
             # Use SymPy for symbolic computation
+            import sympy as sp
+            
+            # Fast path: compiled NumPy callable when every free symbol is
+            # bound to a number or array
+            fast_result = evaluate_cas_numeric(expr, variables)
+            if fast_result is not None:
+                return fast_result
+            
             # Convert string to SymPy expression
-            sympy_expr = sp.sympify(expr)
+            sympy_expr = parse_cas_expression(expr)
             
             # Substitute variables if provided
             if variables:
@@ -135,12 +296,25 @@ def evaluate_expression(expr: str, variables: Dict[str, Any] = None, mode: str =
             # Explicitly add numpy.linalg functions needed for matrix operations
             safe_dict["np"].linalg = np.linalg
             
-            # Add user variables
-            safe_dict.update(variables)
+            # Add user variables; sparse triplet specs become sparse matrices
+            # (stored session variables already are) and are never densified
+            sparse_specs = [value for value in variables.values() if is_sparse_spec(value)]
+            safe_dict.update(
+                (name, decode_sparse(value) if is_sparse_spec(value) else value)
+                for name, value in variables.items()
+            )
             
             # Evaluate the expression
             result = eval(expr, {"__builtins__": {}}, safe_dict)
             
+            if not isinstance(result, (np.ndarray, np.generic, int, float, complex)) and is_sparse(result):
+                sparse_format = sparse_specs[0]["format"] if sparse_specs else "csr"
+                return {
+                    "result": encode_result(result, options.get("encoding") or "json", sparse_format),
+                    "latex": None,
+                    "type": "sparse_matrix"
+                }
+            
             # Convert to list for JSON serialization
             if isinstance(result, np.ndarray):
                 result_list = result.tolist()
@@ -150,9 +324,9 @@ def evaluate_expression(expr: str, variables: Dict[str, Any] = None, mode: str =
             else:
                 result_list = result
                 
-            # Generate LaTeX representation
+            # Generate LaTeX representation, skipping large matrices
             if isinstance(result, np.ndarray):
-                latex = sp.latex(sp.Matrix(result_list))
+                latex = matrix_latex(result) if result.size <= settings.MATRIX_LATEX_MAX_ELEMENTS else None
             else:
                 latex = str(result)
             
@@ -173,51 +347,205 @@ def evaluate_expression(expr: str, variables: Dict[str, Any] = None, mode: str =
         }
 
 
+def session_variables(
+    db: Session,
+    current_user: Optional[models.User],
+    session_id: Optional[int],
+    mode: str = "standard",
+) -> Optional[Dict[str, Any]]:
+    """Return the cached variables of the user's session, or None without one.
+
+    CAS mode substitutes variables symbolically, so only scalar session
+    variables are passed to it.
+    """
+    if not session_id or current_user is None:
+        return None
+    variables = load_session_context(db, session_id, current_user.id)
+    if variables is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if mode == "cas":
+        return {name: value for name, value in variables.items() if isinstance(value, (int, float))}
+    return variables
+
+
 @router.post("/evaluate", response_model=schemas.ComputeResponse)
 def evaluate(
     compute_request: schemas.ComputeRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_optional_current_user),
 ):
-    """Evaluate a mathematical expression."""
-    # Get variables from settings
+    """Evaluate a mathematical expression.
+
+    With ``settings.session_id`` the session's stored variables are in
+    scope; ``settings.variables`` override them.
+    """
     variables = compute_request.settings.get("variables", {})
-    
+    session_id = compute_request.settings.get("session_id")
+    stored = session_variables(db, current_user, session_id, compute_request.mode)
+    if stored:
+        variables = ChainMap(variables, stored)
+
     # Evaluate the expression
     result = evaluate_expression(
         expr=compute_request.expr,
         variables=variables,
-        mode=compute_request.mode
+        mode=compute_request.mode,
+        options=compute_request.settings,
     )
-    
-    # If session_id is provided in settings, save to history
-    session_id = compute_request.settings.get("session_id")
-    if session_id:
-        # Get current user from the request if available
-        current_user = None
+
+    # The session was checked to belong to the user when its variables loaded
+    if stored is not None:
+        background_tasks.add_task(
+            save_to_history,
+            db=db,
+            session_id=session_id,
+            input_expr=compute_request.expr,
+            output=result
+        )
+
+    return result
+
+
+@router.post("/evaluate/batch", response_model=schemas.BatchComputeResponse)
+def evaluate_batch(
+    batch_request: schemas.BatchComputeRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_optional_current_user),
+):
+    """Evaluate several expressions in one request, keeping errors per item.
+
+    Each item is evaluated on its own, with its own variables over those of
+    its session; history for the caller's sessions is written in one insert.
+    """
+    if len(batch_request.items) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds the limit of {settings.MAX_BATCH_SIZE} items",
+        )
+
+    results = []
+    for item in batch_request.items:
+        item_settings = item.settings or {}
+        variables = item_settings.get("variables") or {}
+        session_id = item_settings.get("session_id")
         try:
-            current_user = get_current_active_user()
-        except:
-            pass
-            
-        # If user is authenticated, verify session belongs to user
-        if current_user:
-            db_session = (
-                db.query(models.Session)
-                .filter(models.Session.id == session_id, models.Session.user_id == current_user.id)
-                .first()
+            stored = session_variables(db, current_user, session_id, item.mode)
+        except HTTPException as e:
+            results.append({"result": e.detail, "latex": f"\\text{{Error: {e.detail}}}", "type": "error"})
+            continue
+        if stored:
+            variables = ChainMap(variables, stored)
+        results.append(
+            evaluate_expression(
+                expr=item.expr,
+                variables=variables,
+                mode=item.mode,
+                options=item_settings,
             )
-            if db_session:
-                # Add to history in background
-                background_tasks.add_task(
-                    save_to_history,
-                    db=db,
-                    session_id=session_id,
-                    input_expr=compute_request.expr,
-                    output=result
-                )
-    
-    return result
+        )
+
+    # Save history for items whose session belongs to the user in one insert
+    if current_user:
+        session_ids = {
+            (item.settings or {}).get("session_id") for item in batch_request.items
+        } - {None}
+        if session_ids:
+            owned_ids = {
+                row.id
+                for row in db.query(models.Session.id)
+                .filter(models.Session.id.in_(session_ids), models.Session.user_id == current_user.id)
+                .all()
+            }
+            rows = [
+                {"session_id": item.settings["session_id"], "input": item.expr, "output_json": result}
+                for item, result in zip(batch_request.items, results)
+                if (item.settings or {}).get("session_id") in owned_ids
+            ]
+            if rows:
+                background_tasks.add_task(save_history_batch, db=db, rows=rows)
+
+    return {"results": results}
+
+
+def load_matrix_variables(
+    db: Session,
+    current_user: Optional[models.User],
+    session_id: Optional[int],
+    operands: List[Any],
+) -> Dict[str, Any]:
+    """Load session variables referenced as ``{"variable": name}`` operands."""
+    names = {spec["variable"] for spec in operands if isinstance(spec, dict) and "variable" in spec}
+    if not names:
+        return {}
+    if not session_id:
+        raise HTTPException(status_code=400, detail="settings.session_id is required for variable operands")
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    stored = session_variables(db, current_user, session_id)
+    return {
+        name: (context_array(stored[name]), (session_id, name))
+        for name in names
+        if name in stored
+    }
+
+
+@router.post("/matrix", response_model=schemas.ComputeResponse)
+def matrix_operation(
+    matrix_request: schemas.MatrixRequest,
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_optional_current_user),
+):
+    """Run a named matrix operation on typed array operands.
+
+    Operands may reference session variables as ``{"variable": name}``;
+    their factorizations are cached across requests.
+    """
+    options = matrix_request.settings or {}
+    try:
+        variables = load_matrix_variables(db, current_user, options.get("session_id"), matrix_request.operands)
+        return evaluate_matrix_request(
+            matrix_request.operation,
+            matrix_request.operands,
+            options,
+            variables=variables,
+        )
+    except (ValueError, np.linalg.LinAlgError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/latex", response_model=None)
+def expression_latex(compute_request: schemas.ComputeRequest):
+    """Render the LaTeX form of an expression without evaluating it."""
+    try:
+        return {"latex": render_latex(compute_request.expr)}
+    except CASBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CASTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CASWorkerError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cache/stats", response_model=None)
+def cache_stats():
+    """Report hit/miss/eviction counters for the compute caches."""
+    from app.precision import context_cache
+
+    return {
+        "expressions": expression_cache.stats(),
+        "latex": latex_cache.stats(),
+        "cas_expressions": cas_expression_cache.stats(),
+        "lambdify": lambdify_cache.stats(),
+        "factorizations": factorization_cache.stats(),
+        "session_contexts": session_context_cache.stats(),
+        "precision_contexts": context_cache.stats(),
+        "cas_results": cas_result_cache.stats(),
+        "cas_executor": cas_executor.stats(),
+    }
 
 
 def save_to_history(db: Session, session_id: int, input_expr: str, output: Dict[str, Any]):
@@ -231,22 +559,128 @@ def save_to_history(db: Session, session_id: int, input_expr: str, output: Dict[
     db.commit()
 
 
+def save_history_batch(db: Session, rows: List[Dict[str, Any]]):
+    """Save several computations to history in one bulk insert."""
+    db.bulk_insert_mappings(models.History, rows)
+    db.commit()
+
+
+def compute_cas(
+    operation: str,
+    expr: str,
+    options: Dict[str, Any],
+    timeout: Optional[float] = None,
+    **submit_options,
+):
+    """Run a CAS operation on the worker pool, using the CAS result cache.
+
+    Results are looked up under the input text first, then under the
+    canonical form of the input. Sympifying is unbounded, so the canonical
+    key is computed on a worker too, and ``timeout`` covers both tasks.
+    """
+    key = text_key(operation, expr, options)
+    result = cas_result_cache.get(key)
+    if result is None:
+        timeout = cas_executor.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        canonical = cas_executor.submit(
+            CANONICAL_KEY, expr, {"operation": operation, "options": options},
+            timeout=timeout, **submit_options,
+        )
+        result = cas_result_cache.get(canonical)
+        if result is None:
+            cancel_event = submit_options.get("cancel_event")
+            if cancel_event is not None and cancel_event.is_set():
+                raise CASCancelledError("CAS task was cancelled")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CASTimeoutError(f"CAS computation exceeded {timeout} seconds")
+            result = cas_executor.submit(operation, expr, options, timeout=remaining, **submit_options)
+            cas_result_cache.set(canonical, result)
+        cas_result_cache.set(key, result)
+    return result
+
+
+def run_cas(operation: str, compute_request: schemas.ComputeRequest):
+    """Run a CAS operation for a request, mapping failures to HTTP errors."""
+    try:
+        return compute_cas(operation, compute_request.expr, compute_request.settings or {})
+    except CASBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CASTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CASWorkerError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def run_cas_job(operation: str, expr: str, options: Dict[str, Any], cancel_event=None):
+    """Job runner: like compute_cas, but waits for a pool slot and allows a longer timeout.
+
+    The job timeout and ``cancel_event`` cover canonicalizing the input as
+    well as the operation, since both run on CAS workers.
+    """
+    return compute_cas(
+        operation,
+        expr,
+        options,
+        timeout=settings.CAS_JOB_TIMEOUT_SECONDS,
+        wait=True,
+        cancel_event=cancel_event,
+    )
+
+
+job_backend = create_job_backend(run_cas_job)
+
+
+@router.post("/cas/jobs", response_model=None, status_code=202)
+def submit_cas_job(job_request: schemas.CASJobRequest):
+    """Submit a CAS operation to run in the background and return its job id."""
+    # Validated against the SymPy-free key settings so the web process never imports app.cas
+    if job_request.operation not in RESULT_SETTINGS:
+        raise HTTPException(status_code=400, detail=f"Unsupported CAS operation: {job_request.operation}")
+    try:
+        return job_backend.submit(job_request.operation, job_request.expr, job_request.settings or {})
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/cas/jobs/{job_id}", response_model=None)
+def get_cas_job(job_id: str):
+    """Poll the status of a CAS job."""
+    job = job_backend.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/cas/jobs/{job_id}/result", response_model=None)
+def get_cas_job_result(job_id: str):
+    """Fetch the result of a finished CAS job."""
+    job = job_backend.result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in (PENDING, RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    return job
+
+
+@router.delete("/cas/jobs/{job_id}", response_model=None)
+def cancel_cas_job(job_id: str):
+    """Cancel a pending or running CAS job."""
+    job = job_backend.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.post("/cas/simplify", response_model=None)
 def cas_simplify(
     compute_request: schemas.ComputeRequest,
 ):
     """Simplify an expression using CAS."""
-    try:
-        expr = sp.sympify(compute_request.expr)
-        simplified = sp.simplify(expr)
-        
-        return {
-            "result": str(simplified),
-            "latex": sp.latex(simplified),
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return run_cas("simplify", compute_request)
 
 
 @router.post("/cas/factor", response_model=None)
@@ -254,17 +688,7 @@ def cas_factor(
     compute_request: schemas.ComputeRequest,
 ):
     """Factor an expression using CAS."""
-    try:
-        expr = sp.sympify(compute_request.expr)
-        factored = sp.factor(expr)
-        
-        return {
-            "result": str(factored),
-            "latex": sp.latex(factored),
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return run_cas("factor", compute_request)
 
 
 @router.post("/cas/expand", response_model=None)
@@ -272,17 +696,7 @@ def cas_expand(
     compute_request: schemas.ComputeRequest,
 ):
     """Expand an expression using CAS."""
-    try:
-        expr = sp.sympify(compute_request.expr)
-        expanded = sp.expand(expr)
-        
-        return {
-            "result": str(expanded),
-            "latex": sp.latex(expanded),
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return run_cas("expand", compute_request)
 
 
 @router.post("/cas/solve", response_model=None)
@@ -290,37 +704,7 @@ def cas_solve(
     compute_request: schemas.ComputeRequest,
 ):
     """Solve an equation using CAS."""
-    try:
-        # Parse the equation and variable
-        settings = compute_request.settings or {}
-        variable = settings.get("variable", "x")
-        
-        # Check if the expression contains an equals sign
-        if "=" in compute_request.expr:
-            left, right = compute_request.expr.split("=", 1)
-            expr = sp.sympify(left) - sp.sympify(right)
-        else:
-            expr = sp.sympify(compute_request.expr)
-        
-        # Solve the equation
-        solutions = sp.solve(expr, sp.Symbol(variable))
-        
-        # Format the solutions
-        if isinstance(solutions, list):
-            result = [str(sol) for sol in solutions]
-            latex_sols = [sp.latex(sol) for sol in solutions]
-            latex = ", ".join([f"{variable} = {sol}" for sol in latex_sols])
-        else:
-            result = str(solutions)
-            latex = f"{variable} = {sp.latex(solutions)}"
-        
-        return {
-            "result": result,
-            "latex": latex,
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return run_cas("solve", compute_request)
 
 
 @router.post("/cas/integrate", response_model=None)
@@ -328,29 +712,7 @@ def cas_integrate(
     compute_request: schemas.ComputeRequest,
 ):
     """Integrate an expression using CAS."""
-    try:
-        # Parse the expression and variable
-        settings = compute_request.settings or {}
-        variable = settings.get("variable", "x")
-        limits = settings.get("limits", None)
-        
-        expr = sp.sympify(compute_request.expr)
-        var = sp.Symbol(variable)
-        
-        # Perform integration
-        if limits:
-            lower, upper = limits
-            result = sp.integrate(expr, (var, lower, upper))
-        else:
-            result = sp.integrate(expr, var)
-        
-        return {
-            "result": str(result),
-            "latex": sp.latex(result),
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return run_cas("integrate", compute_request)
 
 
 @router.post("/cas/differentiate", response_model=None)
@@ -358,25 +720,7 @@ def cas_differentiate(
     compute_request: schemas.ComputeRequest,
 ):
     """Differentiate an expression using CAS."""
-    try:
-        # Parse the expression and variable
-        settings = compute_request.settings or {}
-        variable = settings.get("variable", "x")
-        order = settings.get("order", 1)
-        
-        expr = sp.sympify(compute_request.expr)
-        var = sp.Symbol(variable)
-        
-        # Perform differentiation
-        result = sp.diff(expr, var, order)
-        
-        return {
-            "result": str(result),
-            "latex": sp.latex(result),
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return run_cas("differentiate", compute_request)
 
 
 @router.post("/cas/limit", response_model=None)
@@ -384,23 +728,4 @@ def cas_limit(
     compute_request: schemas.ComputeRequest,
 ):
     """Calculate the limit of an expression using CAS."""
-    try:
-        # Parse the expression and variable
-        settings = compute_request.settings or {}
-        variable = settings.get("variable", "x")
-        approach = settings.get("approach", 0)
-        direction = settings.get("direction", "+")
-        
-        expr = sp.sympify(compute_request.expr)
-        var = sp.Symbol(variable)
-        
-        # Calculate the limit
-        result = sp.limit(expr, var, approach, direction)
-        
-        return {
-            "result": str(result),
-            "latex": sp.latex(result),
-            "type": "expression"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+    return run_cas("limit", compute_request)
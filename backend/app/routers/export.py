@@ -2,7 +2,6 @@ import os
 import json
 import csv
 import io
-import base64
 from typing import Dict, Any, List
 from datetime import datetime
 
@@ -14,6 +13,9 @@ from app import models, schemas
 from app.database import get_db
 from app.routers.auth import get_current_active_user
 from app.config import settings
+from app.blobs import blob_store
+from app.rendering import IMAGE_MEDIA_TYPES
+from app.routers.graph import graph_image_blob
 
 router = APIRouter()
 
@@ -248,40 +250,18 @@ def export_graph(
     if not db_session:
         raise HTTPException(status_code=403, detail="Not authorized to access this graph")
     
-    # Check if graph has image data
-    if not graph.image_data:
-        raise HTTPException(status_code=400, detail="Graph has no image data")
-    
-    # Extract base64 data
+    # Serve the image straight from the blob store
     try:
-        # Remove data URL prefix if present
-        if graph.image_data.startswith("data:image/"):
-            # Extract the base64 part after the comma
-            base64_data = graph.image_data.split(",", 1)[1]
-        else:
-            base64_data = graph.image_data
-        
-        # Decode base64 data
-        image_data = base64.b64decode(base64_data)
-        
-        # Create a temporary file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"graph_{graph_id}_{timestamp}.png"
-        filepath = os.path.join(settings.EXPORT_DIR, filename)
-        
-        # Ensure export directory exists
-        os.makedirs(settings.EXPORT_DIR, exist_ok=True)
-        
-        # Write image data to file
-        with open(filepath, "wb") as f:
-            f.write(image_data)
-        
-        # Return the file
-        return FileResponse(
-            path=filepath,
-            filename=filename,
-            media_type="image/png"
-        )
-    
+        name = graph_image_blob(db, graph)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error exporting graph: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error exporting graph: {str(e)}")
+    if name is None or not blob_store.exists(name):
+        raise HTTPException(status_code=400, detail="Graph has no image data")
+    
+    extension = name.rsplit(".", 1)[1]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return FileResponse(
+        path=blob_store.path(name),
+        filename=f"graph_{graph_id}_{timestamp}.{extension}",
+        media_type=IMAGE_MEDIA_TYPES[extension]
+    )
@@ -1,315 +1,391 @@
-import io
+import os
+import json
 import base64
+import hashlib
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import charts, models, schemas
 from app.database import get_db
-from app.routers.auth import get_current_active_user
+from app.routers.auth import get_current_active_user, get_optional_current_user
 from app.config import settings
+from app.blobs import blob_store
+from app.cache import DiskCache, LRUCache, TwoTierCache
+from app.encoding import encode_array
+from app.expressions import compile_expression, evaluate_chunked, expression_components, normalize_expression
+from app.rendering import (
+    IMAGE_MEDIA_TYPES,
+    RenderBusyError,
+    RenderTimeoutError,
+    accepts_image,
+    image_options,
+    render_pool,
+)
+from app.sampling import DEFAULT_TOLERANCE, adaptive_sample
 
 router = APIRouter()
 
+# Settings that say where a plot is saved rather than what it looks like
+SESSION_SETTINGS = ("session_id", "name")
 
-def generate_plot(expr: str, domain: Dict[str, Any], plot_type: str = "2d", settings: Dict[str, Any] = None):
-    """Generate a plot based on the expression and domain."""
+# Bump when a sampling or rendering change makes cached plots stale
+RENDER_CACHE_VERSION = 1
+
+
+def _rendered_size(rendered: Dict[str, Any]) -> int:
+    return len(json.dumps(rendered))
+
+
+# Rendered images and data-mode samples keyed by the hash of their inputs
+plot_cache = TwoTierCache(
+    memory=LRUCache(
+        maxsize=settings.PLOT_CACHE_SIZE,
+        max_weight=settings.PLOT_CACHE_MAX_BYTES,
+        weigher=_rendered_size,
+    ),
+    disk=DiskCache(
+        os.path.join(settings.CACHE_DIR, "plots.sqlite3"),
+        max_bytes=settings.PLOT_CACHE_DISK_MAX_BYTES,
+    ),
+    dumps=lambda value: json.dumps(value).encode("utf-8"),
+    loads=json.loads,
+)
+
+
+def plot_key(expr: str, domain: Dict[str, Any], plot_type: str = "2d", settings: Dict[str, Any] = None) -> str:
+    """Content address of a plot: a hash of everything that affects its output."""
+    canonical = {
+        "version": RENDER_CACHE_VERSION,
+        "expr": normalize_expression(expr),
+        "domain": domain,
+        "type": plot_type,
+        "settings": {k: v for k, v in (settings or {}).items() if k not in SESSION_SETTINGS},
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def sample_plot(expr: str, domain: Dict[str, Any], plot_type: str = "2d", settings: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Evaluate the expression over the plot domain without rendering anything.
+
+    Returns the title label and the sampled arrays: x/y for 2d and
+    parametric plots, theta/r for polar plots, and x/y vectors with a z grid
+    for 3d plots.
+    """
     if settings is None:
         settings = {}
     
-    try:
-        # Create a new figure
-        plt.figure(figsize=(10, 6))
+    if plot_type == "2d":
+        # Extract domain information
+        x_min = domain.get("x_min", -10)
+        x_max = domain.get("x_max", 10)
+        num_points = domain.get("num_points", 1000)
         
-        if plot_type == "2d":
-            # Extract domain information
-            x_min = domain.get("x_min", -10)
-            x_max = domain.get("x_max", 10)
-            num_points = domain.get("num_points", 1000)
-            
-            # Generate x values
-            x = np.linspace(x_min, x_max, num_points)
-            
-            # Create a safe namespace for evaluation
-            safe_dict = {
-                "x": x,
-                "sin": np.sin,
-                "cos": np.cos,
-                "tan": np.tan,
-                "asin": np.arcsin,
-                "acos": np.arccos,
-                "atan": np.arctan,
-                "sinh": np.sinh,
-                "cosh": np.cosh,
-                "tanh": np.tanh,
-                "asinh": np.arcsinh,
-                "acosh": np.arccosh,
-                "atanh": np.arctanh,
-                "log": np.log10,
-                "ln": np.log,
-                "log2": np.log2,
-                "exp": np.exp,
-                "sqrt": np.sqrt,
-                "abs": np.abs,
-                "pi": np.pi,
-                "e": np.e,
-                "bitwise_xor": np.bitwise_xor,
-                "^" : np.power,
-                "**" : np.power,
-                "pow": np.power,
-            }
-            
-            # Evaluate the expression
-            expr = expr.replace("π", "pi").replace("τ", "2*pi").replace("e", "e").replace("^", "**")
-            y = eval(expr, {"__builtins__": {}}, safe_dict)
-            
-            # Plot the function
-            plt.plot(x, y, label=expr)
-            
-            # Add grid and labels
-            plt.grid(True, alpha=0.3)
-            plt.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-            plt.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-            plt.xlabel('x')
-            plt.ylabel('y')
-            plt.title(f'Plot of {expr}')
-            plt.legend()
-            
-            # Apply plot settings
-            if settings.get("y_min") is not None and settings.get("y_max") is not None:
-                plt.ylim(settings.get("y_min"), settings.get("y_max"))
-            
-        elif plot_type == "parametric":
-            # Extract domain information
-            t_min = domain.get("t_min", 0)
-            t_max = domain.get("t_max", 2 * np.pi)
-            num_points = domain.get("num_points", 1000)
-            
-            # Generate parameter values
-            t = np.linspace(t_min, t_max, num_points)
-            
-            # Parse x and y expressions
-            x_expr = expr.split(",")[0].strip()
-            y_expr = expr.split(",")[1].strip()
-            
-            # Create a safe namespace for evaluation
-            safe_dict = {
-                "t": t,
-                "sin": np.sin,
-                "cos": np.cos,
-                "tan": np.tan,
-                "asin": np.arcsin,
-                "acos": np.arccos,
-                "atan": np.arctan,
-                "sinh": np.sinh,
-                "cosh": np.cosh,
-                "tanh": np.tanh,
-                "asinh": np.arcsinh,
-                "acosh": np.arccosh,
-                "atanh": np.arctanh,
-                "log": np.log10,
-                "ln": np.log,
-                "log2": np.log2,
-                "exp": np.exp,
-                "sqrt": np.sqrt,
-                "abs": np.abs,
-                "pi": np.pi,
-                "e": np.e,
-                "bitwise_xor": np.bitwise_xor,
-                "^" : np.power,
-                "**" : np.power,
-                "pow": np.power,
-            }
-            
-            # Evaluate the expressions
-            x_expr = x_expr.replace("π", "pi").replace("τ", "2*pi").replace("e", "e").replace("^", "**")
-            y_expr = y_expr.replace("π", "pi").replace("τ", "2*pi").replace("e", "e").replace("^", "**")
-            x = eval(x_expr, {"__builtins__": {}}, safe_dict)
-            y = eval(y_expr, {"__builtins__": {}}, safe_dict)
-            
-            # Plot the parametric curve
-            plt.plot(x, y)
-            
-            # Add grid and labels
-            plt.grid(True, alpha=0.3)
-            plt.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-            plt.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-            plt.xlabel('x')
-            plt.ylabel('y')
-            plt.title(f'Parametric Plot: x={x_expr}, y={y_expr}')
-            
-            # Apply plot settings
-            if settings.get("x_min") is not None and settings.get("x_max") is not None:
-                plt.xlim(settings.get("x_min"), settings.get("x_max"))
-            if settings.get("y_min") is not None and settings.get("y_max") is not None:
-                plt.ylim(settings.get("y_min"), settings.get("y_max"))
-            
-        elif plot_type == "polar":
-            # Extract domain information
-            theta_min = domain.get("theta_min", 0)
-            theta_max = domain.get("theta_max", 2 * np.pi)
-            num_points = domain.get("num_points", 1000)
-            
-            # Generate theta values
-            theta = np.linspace(theta_min, theta_max, num_points)
-            
-            # Create a safe namespace for evaluation
-            safe_dict = {
-                "theta": theta,
-                "sin": np.sin,
-                "cos": np.cos,
-                "tan": np.tan,
-                "asin": np.arcsin,
-                "acos": np.arccos,
-                "atan": np.arctan,
-                "sinh": np.sinh,
-                "cosh": np.cosh,
-                "tanh": np.tanh,
-                "asinh": np.arcsinh,
-                "acosh": np.arccosh,
-                "atanh": np.arctanh,
-                "log": np.log10,
-                "ln": np.log,
-                "log2": np.log2,
-                "exp": np.exp,
-                "sqrt": np.sqrt,
-                "abs": np.abs,
-                "pi": np.pi,
-                "e": np.e,
-                "bitwise_xor": np.bitwise_xor,
-                "^" : np.power,
-                "**" : np.power,
-                "pow": np.power,
-            }
-            
-            # Evaluate the expression
-            r_expr = r_expr.replace("π", "pi").replace("τ", "2*pi").replace("e", "e").replace("^", "**")
-            r = eval(r_expr, {"__builtins__": {}}, safe_dict)
-            
-            # Create polar plot
-            ax = plt.subplot(111, projection='polar')
-            ax.plot(theta, r)
-            ax.set_title(f'Polar Plot: r={r_expr}')
-            ax.grid(True)
-            
-        elif plot_type == "3d":
-            # Extract domain information
-            x_min = domain.get("x_min", -5)
-            x_max = domain.get("x_max", 5)
-            y_min = domain.get("y_min", -5)
-            y_max = domain.get("y_max", 5)
-            num_points = domain.get("num_points", 100)
-            
-            # Generate x and y values
-            x = np.linspace(x_min, x_max, num_points)
-            y = np.linspace(y_min, y_max, num_points)
-            X, Y = np.meshgrid(x, y)
-            
-            # Create a safe namespace for evaluation
-            safe_dict = {
-                "x": X,
-                "y": Y,
-                "sin": np.sin,
-                "cos": np.cos,
-                "tan": np.tan,
-                "asin": np.arcsin,
-                "acos": np.arccos,
-                "atan": np.arctan,
-                "sinh": np.sinh,
-                "cosh": np.cosh,
-                "tanh": np.tanh,
-                "asinh": np.arcsinh,
-                "acosh": np.arccosh,
-                "atanh": np.arctanh,
-                "log": np.log10,
-                "ln": np.log,
-                "log2": np.log2,
-                "exp": np.exp,
-                "sqrt": np.sqrt,
-                "abs": np.abs,
-                "pi": np.pi,
-                "e": np.e,
-                "bitwise_xor": np.bitwise_xor,
-                "^" : np.power,
-                "**" : np.power,
-                "pow": np.power,
-            }
-            
-            # Evaluate the expression
-            expr = expr.replace("π", "pi").replace("τ", "2*pi").replace("e", "e").replace("^", "**")
-            Z = eval(expr, {"__builtins__": {}}, safe_dict)
-            
-            # Create 3D plot
-            ax = plt.subplot(111, projection='3d')
-            surf = ax.plot_surface(X, Y, Z, cmap='viridis', alpha=0.8)
-            
-            # Add labels and title
-            ax.set_xlabel('X')
-            ax.set_ylabel('Y')
-            ax.set_zlabel('Z')
-            ax.set_title(f'3D Plot: z={expr}')
-            plt.colorbar(surf)
-            
-        else:
-            raise ValueError(f"Unsupported plot type: {plot_type}")
+        compiled = compile_expression(expr, bound=("x",))
+        if settings.get("sampling") == "adaptive":
+            # num_points is the point budget; breaks are NaN entries
+            x, values = adaptive_sample(
+                lambda x: np.broadcast_to(compiled({"x": x}), (1, x.size)),
+                x_min,
+                x_max,
+                budget=num_points,
+                tolerance=settings.get("tolerance", DEFAULT_TOLERANCE),
+            )
+            return {"label": compiled.source, "arrays": {"x": x, "y": values[0]}}
+        
+        # Generate x values
+        x = np.linspace(x_min, x_max, num_points)
         
-        # Save the plot to a BytesIO object
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
+        # Evaluate the expression over the whole grid at once
+        y = np.broadcast_to(compiled({"x": x}), x.shape)
+        return {"label": compiled.source, "arrays": {"x": x, "y": y}}
+    
+    if plot_type == "parametric":
+        # Extract domain information
+        t_min = domain.get("t_min", 0)
+        t_max = domain.get("t_max", 2 * np.pi)
+        num_points = domain.get("num_points", 1000)
+        
+        # Parse x and y expressions
+        components = expression_components(expr)
+        if len(components) != 2:
+            raise ValueError("Parametric plots need two expressions: x(t), y(t)")
+        x_expr, y_expr = components
+        x_compiled = compile_expression(x_expr, bound=("t",))
+        y_compiled = compile_expression(y_expr, bound=("t",))
+        label = f"x={x_expr}, y={y_expr}"
+        
+        def curve(t: np.ndarray) -> np.ndarray:
+            return np.stack([
+                np.broadcast_to(x_compiled({"t": t}), t.shape),
+                np.broadcast_to(y_compiled({"t": t}), t.shape),
+            ])
+        
+        if settings.get("sampling") == "adaptive":
+            t, values = adaptive_sample(
+                curve,
+                t_min,
+                t_max,
+                budget=num_points,
+                tolerance=settings.get("tolerance", DEFAULT_TOLERANCE),
+            )
+            return {"label": label, "arrays": {"x": values[0], "y": values[1]}}
+        
+        # Generate parameter values and evaluate both expressions
+        t = np.linspace(t_min, t_max, num_points)
+        x, y = curve(t)
+        return {"label": label, "arrays": {"x": x, "y": y}}
+    
+    if plot_type == "polar":
+        # Extract domain information
+        theta_min = domain.get("theta_min", 0)
+        theta_max = domain.get("theta_max", 2 * np.pi)
+        num_points = domain.get("num_points", 1000)
+        
+        # Generate theta values
+        theta = np.linspace(theta_min, theta_max, num_points)
         
-        # Convert to base64 for embedding in HTML/JSON
-        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        # Evaluate the expression
+        compiled = compile_expression(expr, bound=("theta",))
+        r = np.broadcast_to(compiled({"theta": theta}), theta.shape)
+        return {"label": f"r={compiled.source}", "arrays": {"theta": theta, "r": r}}
+    
+    if plot_type == "3d":
+        # Extract domain information
+        x_min = domain.get("x_min", -5)
+        x_max = domain.get("x_max", 5)
+        y_min = domain.get("y_min", -5)
+        y_max = domain.get("y_max", 5)
+        num_points = domain.get("num_points", 100)
         
-        # Close the plot to free memory
-        plt.close()
+        # Generate x and y values; the grid is never materialized as a meshgrid
+        x = np.linspace(x_min, x_max, num_points)
+        y = np.linspace(y_min, y_max, num_points)
+        
+        # Evaluate the expression in memory-bounded row blocks
+        compiled = compile_expression(expr, bound=("x", "y"))
+        z = evaluate_chunked(
+            compiled, {"x": x[None, :], "y": y[:, None]}, (y.size, x.size), dtype=settings.get("dtype")
+        )
+        return {"label": f"z={compiled.source}", "arrays": {"x": x, "y": y, "z": z}}
+    
+    raise ValueError(f"Unsupported plot type: {plot_type}")
+
+
+def encode_samples(arrays: Dict[str, np.ndarray], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode sampled arrays for the data-only plot mode.
+
+    ``float32`` (default) ships raw little-endian float32 buffers, ``delta``
+    ships quantized deltas as JSON integers (arrays too large to quantize
+    come back as ``list``), ``list`` plain JSON numbers.
+    """
+    encoding = settings.get("encoding", "float32")
+    if encoding == "float32":
+        return {name: encode_array(arr, encoding="base64", dtype="float32") for name, arr in arrays.items()}
+    if encoding == "delta":
+        decimals = int(settings.get("decimals", 6))
+        return {name: encode_array(arr, encoding="delta", decimals=decimals) for name, arr in arrays.items()}
+    if encoding == "list":
+        return {name: encode_array(arr, encoding="list") for name, arr in arrays.items()}
+    raise ValueError(f"Unsupported sample encoding: {encoding}")
+
+
+def render_plot(plot_type: str, label: str, arrays: Dict[str, np.ndarray], settings: Dict[str, Any]) -> str:
+    """Render sampled arrays on the render pool and return a base64 data URL.
+
+    ``settings`` may pick the ``format`` (png, webp, svg), pixel ``width``
+    and ``height``, and ``dpi`` of the image.
+    """
+    image = image_options(settings)
+    content = render_pool.run(charts.function_plot, plot_type, label, arrays, settings, image)
+    
+    # Convert to base64 for embedding in HTML/JSON
+    img_str = base64.b64encode(content).decode('utf-8')
+    return f"data:{image.media_type};base64,{img_str}"
+
+
+def generate_plot(
+    expr: str,
+    domain: Dict[str, Any],
+    plot_type: str = "2d",
+    settings: Dict[str, Any] = None,
+    key: Optional[str] = None,
+):
+    """Generate a plot based on the expression and domain.
+
+    With ``settings.output == "data"`` the sampled arrays are returned in
+    ``plot_data.samples`` and no figure is ever created. Rendered output is
+    cached under ``plot_key``, so an identical plot is a cache lookup; pass
+    ``key`` when the caller has already computed it.
+    """
+    if settings is None:
+        settings = {}
+    
+    try:
+        if key is None:
+            key = plot_key(expr, domain, plot_type, settings)
+        rendered = plot_cache.get(key)
+        if rendered is None:
+            sampled = sample_plot(expr, domain, plot_type, settings)
+            if settings.get("output") == "data":
+                rendered = {"samples": encode_samples(sampled["arrays"], settings), "image": None}
+            else:
+                rendered = {"image": render_plot(plot_type, sampled["label"], sampled["arrays"], settings)}
+            plot_cache.set(key, rendered)
+        
+        plot_data = {
+            "type": plot_type,
+            "expr": expr,
+            "domain": domain,
+            "settings": settings
+        }
+        if "samples" in rendered:
+            plot_data["samples"] = rendered["samples"]
         
         # Return plot data and image
         return {
-            "plot_data": {
-                "type": plot_type,
-                "expr": expr,
-                "domain": domain,
-                "settings": settings
-            },
-            "image": f"data:image/png;base64,{img_str}"
+            "plot_data": plot_data,
+            "image": rendered["image"]
         }
         
+    except (RenderBusyError, RenderTimeoutError):
+        raise
     except Exception as e:
-        # Close any open plots on error
-        plt.close()
         raise ValueError(f"Error generating plot: {str(e)}")
 
 
+# Fraction of a tile sampled beyond each x edge so strokes continue across seams
+TILE_PADDING = 0.02
+
+
+def tile_bounds(zoom: int, tile_x: int, tile_y: int) -> Dict[str, float]:
+    """Plot-space bounds of a tile.
+
+    At zoom 0 a tile spans ``TILE_BASE_SPAN`` units and each zoom level
+    halves it. Tile (0, 0) has its lower-left corner at the origin, and
+    tile y grows upwards like the plot's y axis.
+    """
+    span = settings.TILE_BASE_SPAN / 2 ** zoom
+    return {
+        "x_min": tile_x * span,
+        "x_max": (tile_x + 1) * span,
+        "y_min": tile_y * span,
+        "y_max": (tile_y + 1) * span,
+    }
+
+
+def tile_key(expr: str, zoom: int, tile_x: int, tile_y: int, fmt: str, encoding: str) -> str:
+    """Content address of a tile, cached independently of every other tile."""
+    canonical = {
+        "version": RENDER_CACHE_VERSION,
+        "tile": [zoom, tile_x, tile_y, settings.TILE_SIZE, settings.TILE_BASE_SPAN],
+        "expr": normalize_expression(expr),
+        "format": fmt,
+        "encoding": encoding if fmt == "data" else None,
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def sample_tile(expr: str, bounds: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """Sample y(x) across a tile, keeping only the segments that pass through it."""
+    pad = (bounds["x_max"] - bounds["x_min"]) * TILE_PADDING
+    domain = {
+        "x_min": bounds["x_min"] - pad,
+        "x_max": bounds["x_max"] + pad,
+        "num_points": 2 * settings.TILE_SIZE,
+    }
+    arrays = sample_plot(expr, domain, "2d", {"sampling": "adaptive"})["arrays"]
+    x, y = arrays["x"], np.array(arrays["y"], dtype=float)
+    
+    # A point is kept when it or a neighbour lies in the tile's y band, so
+    # segments entering or leaving the tile still reach its edge
+    with np.errstate(invalid="ignore"):
+        inside = (y >= bounds["y_min"]) & (y <= bounds["y_max"])
+    keep = inside.copy()
+    keep[1:] |= inside[:-1]
+    keep[:-1] |= inside[1:]
+    y[~keep] = np.nan
+    return {"x": x, "y": y}
+
+
+def generate_tile(expr: str, zoom: int, tile_x: int, tile_y: int, fmt: str = "png", encoding: str = "float32") -> Dict[str, Any]:
+    """Return a cached tile: the base64 image under ``image`` or encoded samples under ``samples``."""
+    if fmt != "data" and fmt not in IMAGE_MEDIA_TYPES:
+        raise ValueError(f"Unsupported tile format: {fmt}")
+    if not settings.TILE_MIN_ZOOM <= zoom <= settings.TILE_MAX_ZOOM:
+        raise ValueError(f"Zoom must be between {settings.TILE_MIN_ZOOM} and {settings.TILE_MAX_ZOOM}")
+    
+    key = tile_key(expr, zoom, tile_x, tile_y, fmt, encoding)
+    tile = plot_cache.get(key)
+    if tile is None:
+        bounds = tile_bounds(zoom, tile_x, tile_y)
+        arrays = sample_tile(expr, bounds)
+        if fmt == "data":
+            tile = {"bounds": bounds, "samples": encode_samples(arrays, {"encoding": encoding})}
+        else:
+            content = render_pool.run(charts.tile_image, arrays["x"], arrays["y"], bounds, settings.TILE_SIZE, fmt)
+            tile = {"bounds": bounds, "image": base64.b64encode(content).decode("utf-8")}
+        plot_cache.set(key, tile)
+    return tile
+
+
 @router.post("/plot", response_model=schemas.GraphResponse)
 def create_plot(
     graph_request: schemas.GraphRequest,
     background_tasks: BackgroundTasks,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_optional_current_user),
 ):
-    """Generate a plot based on the expression and domain."""
+    """Generate a plot based on the expression and domain.
+
+    A client whose Accept header asks for the image type (e.g.
+    ``image/svg+xml`` or ``image/*``) gets the raw image bytes instead of
+    the JSON wrapper. The response carries an ETag derived from the plot's
+    inputs; a request whose If-None-Match lists it gets an empty 304.
+    """
     try:
+        settings = graph_request.settings or {}
+        key = plot_key(graph_request.expr, graph_request.domain, graph_request.type, settings)
+        media_type = image_options(settings).media_type if settings.get("output") != "data" else None
+        binary = media_type is not None and accepts_image(request.headers.get("accept"), media_type)
+        
+        # The raw image and the JSON wrapper are different representations
+        headers = {"ETag": f'"{key}-raw"' if binary else f'"{key}"', "Vary": "Accept"}
+        not_modified = _etag_matches(request.headers.get("if-none-match"), headers["ETag"])
+        
+        # A revalidated plot is answered before generating it, unless it
+        # still has to be saved to a session
+        session_id = settings.get("session_id")
+        if not_modified and not session_id:
+            return Response(status_code=304, headers=headers)
+        
         # Generate the plot
         result = generate_plot(
             expr=graph_request.expr,
             domain=graph_request.domain,
             plot_type=graph_request.type,
-            settings=graph_request.settings
+            settings=graph_request.settings,
+            key=key,
         )
         
         # If session_id is provided, try to save the graph
-        session_id = graph_request.settings.get("session_id") if graph_request.settings else None
         if session_id:
-            # Get current user from the request if available
-            current_user = None
-            try:
-                current_user = get_current_active_user()
-            except:
-                pass
-                
             # If user is authenticated, verify session belongs to user
             if current_user:
                 # Verify session belongs to user
@@ -334,26 +410,140 @@ def create_plot(
                         image_data=result["image"]
                     )
         
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+        if binary:
+            return Response(content=decode_data_url(result["image"])[1], media_type=media_type, headers=headers)
+        response.headers.update(headers)
         return result
     
+    except RenderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating plot: {str(e)}")
 
 
+# A saved graph's image lives in the blob store; its row keeps this prefix plus the blob name
+IMAGE_REF_PREFIX = "blob:"
+
+IMAGE_EXTENSIONS = {media_type: fmt for fmt, media_type in IMAGE_MEDIA_TYPES.items()}
+
+# Serializes storing a blob and committing its row against checking for
+# references and deleting it, so a release cannot remove a blob that a
+# concurrent save of the same bytes has just referenced. Other processes
+# are covered by leaving blobs stored within the grace period in place.
+_image_refs_lock = threading.Lock()
+IMAGE_RELEASE_GRACE_SECONDS = 60
+
+
+def decode_data_url(image_data: str) -> Tuple[str, bytes]:
+    """Return the media type and bytes of a base64 data URL (bare base64 is taken as PNG)."""
+    if image_data.startswith("data:"):
+        header, _, data = image_data.partition(",")
+        return header[len("data:"):].split(";")[0], base64.b64decode(data)
+    return "image/png", base64.b64decode(image_data)
+
+
+def store_image(image_data: Optional[str]) -> Optional[str]:
+    """Put a data-URL image in the blob store and return the reference to keep in the row."""
+    if not image_data:
+        return None
+    media_type, content = decode_data_url(image_data)
+    if media_type not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Unsupported image type: {media_type}")
+    return IMAGE_REF_PREFIX + blob_store.put(content, IMAGE_EXTENSIONS[media_type])
+
+
+def graph_image_blob(db: Session, graph: models.Graph) -> Optional[str]:
+    """Return the blob name of a saved graph's image.
+
+    Rows saved before the blob store hold the image inline; it is moved
+    into the store on first access.
+    """
+    if not graph.image_data:
+        return None
+    if not graph.image_data.startswith(IMAGE_REF_PREFIX):
+        with _image_refs_lock:
+            graph.image_data = store_image(graph.image_data)
+            db.commit()
+    return graph.image_data[len(IMAGE_REF_PREFIX):]
+
+
+def release_images(db: Session, refs: List[Optional[str]]) -> None:
+    """Delete the blobs behind ``refs`` that no saved graph refers to any more."""
+    for ref in set(refs):
+        if not ref or not ref.startswith(IMAGE_REF_PREFIX):
+            continue
+        with _image_refs_lock:
+            if db.query(models.Graph.id).filter(models.Graph.image_data == ref).first() is None:
+                blob_store.delete(ref[len(IMAGE_REF_PREFIX):], min_age=IMAGE_RELEASE_GRACE_SECONDS)
+
+
 def save_graph(db: Session, session_id: int, name: str, graph_type: str, expression: str, parameters: Dict[str, Any], image_data: str):
-    """Save graph to database."""
-    graph = models.Graph(
-        session_id=session_id,
-        name=name,
-        type=graph_type,
-        expression=expression,
-        parameters=parameters,
-        image_data=image_data
-    )
-    db.add(graph)
-    db.commit()
+    """Save graph to database, with its image in the blob store."""
+    with _image_refs_lock:
+        graph = models.Graph(
+            session_id=session_id,
+            name=name,
+            type=graph_type,
+            expression=expression,
+            parameters=parameters,
+            image_data=store_image(image_data)
+        )
+        db.add(graph)
+        db.commit()
+
+
+@router.get("/tiles/{zoom}/{tile_x}/{tile_y}", response_model=None)
+def get_tile(
+    zoom: int,
+    tile_x: int,
+    tile_y: int,
+    expr: str,
+    request: Request,
+    format: str = "png",
+    encoding: str = "float32",
+):
+    """Get one map-style tile of the graph of ``expr`` for pan and zoom.
+
+    ``format=png`` (or webp, svg) returns a transparent ``TILE_SIZE`` pixel
+    image of the curve alone; ``format=data`` returns the sampled segments crossing the
+    tile, encoded like the data-only plot mode. Tiles are cached one by
+    one, so panning only computes newly exposed tiles.
+    """
+    # A tile's content never changes for its key, so a match needs no work at all
+    headers = {
+        "ETag": f'"{tile_key(expr, zoom, tile_x, tile_y, format, encoding)}"',
+        "Cache-Control": "public, max-age=86400",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        tile = generate_tile(expr, zoom, tile_x, tile_y, format, encoding)
+    except RenderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error generating tile: {str(e)}")
+    
+    if format == "data":
+        return JSONResponse(
+            {"zoom": zoom, "x": tile_x, "y": tile_y, "bounds": tile["bounds"], "samples": tile["samples"]},
+            headers=headers,
+        )
+    return Response(content=base64.b64decode(tile["image"]), media_type=IMAGE_MEDIA_TYPES[format], headers=headers)
+
+
+@router.get("/cache/stats", response_model=None)
+def cache_stats():
+    """Report counters for the plot render cache and the render pool."""
+    return {"plots": plot_cache.stats(), "render_pool": render_pool.stats()}
 
 
 @router.get("/saved/{graph_id}", response_model=schemas.Graph)
@@ -380,6 +570,43 @@ def get_saved_graph(
     return graph
 
 
+@router.get("/saved/{graph_id}/image", response_model=None)
+def get_saved_graph_image(
+    graph_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Get a saved graph's image.
+
+    Images are content-addressed, so the ETag never changes for a blob and
+    clients may cache it indefinitely.
+    """
+    # Get the graph
+    graph = db.query(models.Graph).filter(models.Graph.id == graph_id).first()
+    if not graph:
+        raise HTTPException(status_code=404, detail="Graph not found")
+    
+    # Verify session belongs to user
+    db_session = (
+        db.query(models.Session)
+        .filter(models.Session.id == graph.session_id, models.Session.user_id == current_user.id)
+        .first()
+    )
+    if not db_session:
+        raise HTTPException(status_code=403, detail="Not authorized to access this graph")
+    
+    name = graph_image_blob(db, graph)
+    if name is None or not blob_store.exists(name):
+        raise HTTPException(status_code=404, detail="Graph has no image")
+    
+    headers = {"ETag": f'"{name.split(".")[0]}"', "Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    media_type = IMAGE_MEDIA_TYPES[name.rsplit(".", 1)[1]]
+    return FileResponse(blob_store.path(name), media_type=media_type, headers=headers)
+
+
 @router.delete("/saved/{graph_id}", status_code=204)
 def delete_saved_graph(
     graph_id: int,
@@ -401,8 +628,10 @@ def delete_saved_graph(
     if not db_session:
         raise HTTPException(status_code=403, detail="Not authorized to access this graph")
     
-    # Delete the graph
+    # Delete the graph, then its image unless another graph shares it
+    image_ref = graph.image_data
     db.delete(graph)
     db.commit()
+    release_images(db, [image_ref])
     
     return None
\ No newline at end of file
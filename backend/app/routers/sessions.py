@@ -1,15 +1,63 @@
-from typing import List
+from typing import Any, Dict, Iterable, List
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.database import get_db
 from app.routers.auth import get_current_active_user
+from app.factorization import invalidate_variable
+from app.routers.graph import release_images
+from app.session_context import invalidate_session_context, materialize_value
+from app.variable_graph import VariableGraph, variable_expression
 
 router = APIRouter()
 
 
+def evaluate_variable(expr: str, variables: Dict[str, Any]) -> Any:
+    from app.routers.compute import evaluate_expression
+
+    # Values re-evaluated earlier in the same pass come back as nested lists
+    variables = {
+        name: np.asarray(value) if isinstance(value, list) else value
+        for name, value in variables.items()
+    }
+    result = evaluate_expression(expr, variables)
+    if result["type"] == "error":
+        raise ValueError(result["result"])
+    return result["result"]
+
+
+def recompute_variables(db: Session, session_id: int, changed: Iterable[str]) -> None:
+    """
+    Re-evaluate the derived variables downstream of ``changed``.
+
+    Pending changes are flushed first so the graph sees them; the caller
+    commits. Raises a 400 (after rolling back) on a circular dependency.
+    """
+    db.flush()
+    db_variables = db.query(models.Variable).filter(models.Variable.session_id == session_id).all()
+    rows = {variable.name: variable for variable in db_variables}
+    # Materialized like the session context, so arrays evaluate as arrays and
+    # encoded or sparse payloads stay in scope
+    values = {}
+    for name, row in rows.items():
+        try:
+            values[name] = materialize_value(row.value_json)
+        except (ValueError, KeyError, TypeError):
+            continue
+    try:
+        graph = VariableGraph({name: variable_expression(row.value_json) for name, row in rows.items()})
+        updates = graph.recompute(values, changed, evaluate_variable)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    for name, value_json in updates.items():
+        rows[name].value_json = value_json
+        invalidate_variable(session_id, name)
+
+
 @router.post("/", response_model=schemas.Session)
 def create_session(
     session: schemas.SessionCreate,
@@ -93,8 +141,11 @@ def delete_session(
     if db_session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    image_refs = [graph.image_data for graph in db_session.graphs]
     db.delete(db_session)
     db.commit()
+    invalidate_session_context(session_id)
+    release_images(db, image_refs)
     return None
 
 
@@ -116,7 +167,9 @@ def create_variable(
     
     db_variable = models.Variable(**variable.dict())
     db.add(db_variable)
+    recompute_variables(db, variable.session_id, [variable.name])
     db.commit()
+    invalidate_session_context(variable.session_id)
     db.refresh(db_variable)
     return db_variable
 
@@ -163,10 +216,18 @@ def update_variable(
     if db_session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    # Cached factorizations of the old value (or old name) are now stale
+    old_name = db_variable.name
+    invalidate_variable(db_variable.session_id, old_name)
+    invalidate_variable(db_variable.session_id, variable.name)
+    
     for key, value in variable.dict().items():
         setattr(db_variable, key, value)
     
+    # Dependents of both the old and the new name see the change
+    recompute_variables(db, db_variable.session_id, {old_name, variable.name})
     db.commit()
+    invalidate_session_context(db_variable.session_id)
     db.refresh(db_variable)
     return db_variable
 
@@ -190,8 +251,12 @@ def delete_variable(
     if db_session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    invalidate_variable(db_variable.session_id, db_variable.name)
+    
     db.delete(db_variable)
+    recompute_variables(db, db_session.id, [db_variable.name])
     db.commit()
+    invalidate_session_context(db_session.id)
     return None
 
 
@@ -1,18 +1,15 @@
 import numpy as np
-import pandas as pd
-import scipy.stats as stats
-import matplotlib.pyplot as plt
-import io
 import base64
 from typing import Dict, Any, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import charts, models, schemas
 from app.database import get_db
 from app.routers.auth import get_current_active_user
 from app.config import settings
+from app.rendering import ImageOptions, RenderBusyError, RenderTimeoutError, accepts_image, image_options, render_pool
 
 router = APIRouter()
 
@@ -62,11 +59,28 @@ def parse_xy_data(data_str: str) -> tuple:
         raise HTTPException(status_code=400, detail=f"Invalid data format for x,y pairs: {str(e)}")
 
 
+def parse_image_options(data: Dict[str, Any]) -> ImageOptions:
+    """Read the requested image format, size and DPI from a visualization request."""
+    try:
+        return image_options(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def image_result(request: Request, content: bytes, image: ImageOptions):
+    """Return raw image bytes if the client accepts them, else the base64 JSON wrapper."""
+    if accepts_image(request.headers.get("accept"), image.media_type):
+        return Response(content=content, media_type=image.media_type)
+    return {"image": base64.b64encode(content).decode('utf-8'), "media_type": image.media_type}
+
+
 @router.post("/descriptive", response_model=Dict[str, Any])
 async def calculate_descriptive_statistics(data: Dict[str, str]):
     """
     Calculate descriptive statistics for a dataset
     """
+    import scipy.stats as stats
+    
     try:
         # Parse the input data
         data_array = parse_data(data.get("data", ""))
@@ -116,6 +130,8 @@ async def calculate_regression(data: Dict[str, str]):
     Perform regression analysis on x,y data pairs
     Supports linear, quadratic, exponential, and logarithmic regression
     """
+    import scipy.stats as stats
+    
     try:
         # Get regression type
         regression_type = data.get("type", "linear").lower()
@@ -246,6 +262,8 @@ async def calculate_distribution(data: Dict[str, Any]):
     Calculate probability distribution values
     Supports normal, binomial, poisson, t, chi-squared, and F distributions
     """
+    import scipy.stats as stats
+    
     try:
         dist_type = data.get("type", "").lower()
         if not dist_type:
@@ -519,10 +537,11 @@ async def calculate_distribution(data: Dict[str, Any]):
 
 
 @router.post("/visualization/histogram", response_model=None)
-async def generate_histogram(data: Dict[str, Any]):
+async def generate_histogram(data: Dict[str, Any], request: Request):
     """
     Generate a histogram visualization from data
     """
+    image = parse_image_options(data)
     try:
         # Get data array
         data_array = data.get("data", [])
@@ -541,42 +560,23 @@ async def generate_histogram(data: Dict[str, Any]):
         ylabel = data.get("ylabel", "Frequency")
         color = data.get("color", "blue")
         
-        # Create figure
-        plt.figure(figsize=(10, 6))
-        plt.hist(data_array, bins=bins, color=color, alpha=0.7, edgecolor='black')
-        
-        # Add labels and title
-        plt.title(title)
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
-        plt.grid(True, alpha=0.3)
-        
-        # Add descriptive statistics as text
-        stats_text = f"Mean: {np.mean(data_array):.2f}\nMedian: {np.median(data_array):.2f}"
-        if len(data_array) > 1:
-            stats_text += f"\nStd Dev: {np.std(data_array, ddof=1):.2f}"
-        plt.annotate(stats_text, xy=(0.95, 0.95), xycoords='axes fraction', 
-                     ha='right', va='top', bbox=dict(boxstyle='round', alpha=0.1))
-        
-        # Save plot to a bytes buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        plt.close()
-        
-        # Encode the image to base64 string
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return {"image": img_str}
+        # Render on the pool so the event loop is never blocked
+        content = await render_pool.run_async(charts.histogram, data_array, bins, title, xlabel, ylabel, color, image)
+        return image_result(request, content, image)
+    except RenderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating histogram: {str(e)}")
 
 
 @router.post("/visualization/boxplot", response_model=None)
-async def generate_boxplot(data: Dict[str, Any]):
+async def generate_boxplot(data: Dict[str, Any], request: Request):
     """
     Generate a box plot visualization from data
     """
+    image = parse_image_options(data)
     try:
         # Get data array
         data_array = data.get("data", [])
@@ -594,48 +594,23 @@ async def generate_boxplot(data: Dict[str, Any]):
         ylabel = data.get("ylabel", "Value")
         color = data.get("color", "blue")
         
-        # Create figure
-        plt.figure(figsize=(10, 6))
-        box = plt.boxplot([data_array], patch_artist=True, vert=True, labels=[xlabel])
-        
-        # Set colors
-        for patch in box['boxes']:
-            patch.set_facecolor(color)
-            patch.set_alpha(0.7)
-        
-        # Add labels and title
-        plt.title(title)
-        plt.ylabel(ylabel)
-        plt.grid(True, alpha=0.3)
-        
-        # Add descriptive statistics as text
-        q1 = np.percentile(data_array, 25)
-        q3 = np.percentile(data_array, 75)
-        iqr = q3 - q1
-        stats_text = f"Min: {np.min(data_array):.2f}\nQ1: {q1:.2f}\nMedian: {np.median(data_array):.2f}"
-        stats_text += f"\nQ3: {q3:.2f}\nMax: {np.max(data_array):.2f}\nIQR: {iqr:.2f}"
-        plt.annotate(stats_text, xy=(0.95, 0.95), xycoords='axes fraction', 
-                     ha='right', va='top', bbox=dict(boxstyle='round', alpha=0.1))
-        
-        # Save plot to a bytes buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        plt.close()
-        
-        # Encode the image to base64 string
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return {"image": img_str}
+        # Render on the pool so the event loop is never blocked
+        content = await render_pool.run_async(charts.boxplot, data_array, title, xlabel, ylabel, color, image)
+        return image_result(request, content, image)
+    except RenderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating box plot: {str(e)}")
 
 
 @router.post("/visualization/scatterplot", response_model=None)
-async def generate_scatterplot(data: Dict[str, Any]):
+async def generate_scatterplot(data: Dict[str, Any], request: Request):
     """
     Generate a scatter plot visualization from x,y data pairs
     """
+    image = parse_image_options(data)
     try:
         # Get x and y data arrays
         x_data = data.get("x", [])
@@ -667,52 +642,15 @@ async def generate_scatterplot(data: Dict[str, Any]):
         show_regression = data.get("show_regression", True)
         regression_type = data.get("regression_type", "linear")
         
-        # Create figure
-        plt.figure(figsize=(10, 6))
-        plt.scatter(x_data, y_data, color=color, alpha=0.7, edgecolor='black')
-        
-        # Add regression line if requested
-        if show_regression:
-            if regression_type == "linear":
-                # Linear regression
-                slope, intercept, r_value, p_value, std_err = stats.linregress(x_data, y_data)
-                x_line = np.linspace(min(x_data), max(x_data), 100)
-                y_line = slope * x_line + intercept
-                plt.plot(x_line, y_line, 'r-', alpha=0.7)
-                
-                # Add regression equation and R² to plot
-                eq_text = f"y = {slope:.4f}x + {intercept:.4f}\nR² = {r_value**2:.4f}"
-                plt.annotate(eq_text, xy=(0.05, 0.95), xycoords='axes fraction', 
-                             ha='left', va='top', bbox=dict(boxstyle='round', alpha=0.1))
-            
-            elif regression_type == "quadratic":
-                # Quadratic regression
-                coeffs = np.polyfit(x_data, y_data, 2)
-                x_line = np.linspace(min(x_data), max(x_data), 100)
-                y_line = coeffs[0] * x_line**2 + coeffs[1] * x_line + coeffs[2]
-                plt.plot(x_line, y_line, 'r-', alpha=0.7)
-                
-                # Add regression equation to plot
-                eq_text = f"y = {coeffs[0]:.4f}x² + {coeffs[1]:.4f}x + {coeffs[2]:.4f}"
-                plt.annotate(eq_text, xy=(0.05, 0.95), xycoords='axes fraction', 
-                             ha='left', va='top', bbox=dict(boxstyle='round', alpha=0.1))
-        
-        # Add labels and title
-        plt.title(title)
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
-        plt.grid(True, alpha=0.3)
-        
-        # Save plot to a bytes buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        plt.close()
-        
-        # Encode the image to base64 string
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return {"image": img_str}
+        # Render on the pool so the event loop is never blocked
+        content = await render_pool.run_async(
+            charts.scatterplot, x_data, y_data, title, xlabel, ylabel, color, show_regression, regression_type, image
+        )
+        return image_result(request, content, image)
+    except RenderBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating scatter plot: {str(e)}")
 
@@ -723,6 +661,8 @@ async def perform_hypothesis_test(data: Dict[str, Any]):
     Perform hypothesis testing
     Supports z-test, t-test, chi-squared test, and ANOVA
     """
+    import scipy.stats as stats
+    
     try:
         test_type = data.get("type", "").lower()
         if not test_type:
@@ -0,0 +1,152 @@
+"""
+Adaptive sampling for 2d and parametric plots.
+
+Instead of a fixed ``linspace``, the curve is sampled on a coarse grid and
+intervals are split where the midpoint deviates from the chord through its
+neighbours, so smooth stretches stay sparse and bends, oscillations and
+asymptotes get the points. Jumps that survive repeated bisection are
+discontinuities; a NaN break is inserted there so no vertical line is
+drawn. At most ``budget`` curve points are kept, and locating
+discontinuities costs at most as many evaluations again, so a plot never
+evaluates more than twice its budget.
+"""
+from typing import Callable, Tuple
+
+import numpy as np
+
+# Deviation from the chord, relative to the plot's value range, worth a split
+DEFAULT_TOLERANCE = 1e-3
+
+# Halvings below the initial spacing before an interval is left alone
+MAX_DEPTH = 16
+
+# Jumps (relative to the value range) checked for discontinuities, and how
+# hard; candidates are also capped so their bisections fit in the budget
+BREAK_THRESHOLD = 0.01
+BREAK_BISECTIONS = 20
+MAX_BREAK_CANDIDATES = 64
+
+
+def _value_window(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return per-coordinate low/high clip bounds and scale from the finite values.
+
+    Percentiles keep asymptotes from dominating the scale, and values are
+    clipped to one range beyond them so refinement does not chase infinity.
+    """
+    lows, highs = [], []
+    for row in values:
+        finite = row[np.isfinite(row)]
+        if finite.size == 0:
+            lows.append(-1.0)
+            highs.append(1.0)
+            continue
+        low, high = np.percentile(finite, [5, 95])
+        if high - low <= 0:
+            low, high = low - 1.0, high + 1.0
+        lows.append(low)
+        highs.append(high)
+    low, high = np.asarray(lows)[:, None], np.asarray(highs)[:, None]
+    scale = high - low
+    return low - scale, high + scale, scale
+
+
+def _normalized(values: np.ndarray, window) -> np.ndarray:
+    low, high, scale = window
+    return np.clip(values, low, high) / scale
+
+
+def _interval_errors(t: np.ndarray, values: np.ndarray, window) -> np.ndarray:
+    """Error of each interval: the larger chord deviation at its two endpoints."""
+    v = _normalized(values, window)
+    finite = np.all(np.isfinite(values), axis=0)
+    deviation = np.zeros(t.size)
+    if t.size > 2:
+        weight = (t[1:-1] - t[:-2]) / (t[2:] - t[:-2])
+        chord = v[:, :-2] + (v[:, 2:] - v[:, :-2]) * weight
+        deviation[1:-1] = np.sqrt(np.sum((v[:, 1:-1] - chord) ** 2, axis=0))
+    deviation = np.nan_to_num(deviation, nan=0.0)
+    errors = np.maximum(deviation[:-1], deviation[1:])
+    # Intervals where the curve enters or leaves its domain always refine
+    errors[finite[:-1] != finite[1:]] = np.inf
+    return errors
+
+
+def _jumps(left: np.ndarray, right: np.ndarray, window) -> np.ndarray:
+    jump = np.sqrt(np.sum((_normalized(right, window) - _normalized(left, window)) ** 2, axis=0))
+    return np.nan_to_num(jump, nan=0.0)
+
+
+def _find_breaks(func, t: np.ndarray, values: np.ndarray, window, budget: int) -> np.ndarray:
+    """Return parameter values of discontinuities between consecutive samples.
+
+    The largest jumps are checked first, using at most ``budget`` evaluations.
+    """
+    jumps = _jumps(values[:, :-1], values[:, 1:], window)
+    candidates = np.flatnonzero(jumps > BREAK_THRESHOLD)
+    limit = min(MAX_BREAK_CANDIDATES, budget // BREAK_BISECTIONS)
+    if candidates.size == 0 or limit == 0:
+        return np.empty(0)
+    if candidates.size > limit:
+        candidates = np.sort(candidates[np.argsort(jumps[candidates])[-limit:]])
+
+    a, b = t[candidates], t[candidates + 1]
+    va, vb = values[:, candidates], values[:, candidates + 1]
+    initial = jumps[candidates]
+    for _ in range(BREAK_BISECTIONS):
+        m = (a + b) / 2
+        vm = func(m)
+        # Follow the half that carries most of the jump
+        left = _jumps(va, vm, window) >= _jumps(vm, vb, window)
+        b = np.where(left, m, b)
+        vb = np.where(left, vm, vb)
+        a = np.where(left, a, m)
+        va = np.where(left, va, vm)
+    # A continuous function's jump shrinks with the bracket; a discontinuity's does not
+    undefined = ~np.all(np.isfinite(va) & np.isfinite(vb), axis=0)
+    is_break = (_jumps(va, vb, window) > 0.5 * initial) | undefined
+    return ((a + b) / 2)[is_break]
+
+
+def adaptive_sample(
+    func: Callable[[np.ndarray], np.ndarray],
+    start: float,
+    stop: float,
+    budget: int = 1000,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample ``func`` on ``[start, stop]`` adaptively.
+
+    ``func`` maps a parameter array of length n to a ``(k, n)`` array of
+    coordinates (k=1 for a graph y(x), k=2 for a parametric curve). At most
+    ``budget`` curve points are kept, plus one NaN break per detected
+    discontinuity. Returns the parameter values and the coordinates.
+    """
+    budget = max(int(budget), 2)
+    initial = min(budget, max(16, budget // 4))
+    t = np.linspace(start, stop, initial)
+    min_width = (stop - start) / max(initial - 1, 1) / 2 ** MAX_DEPTH
+
+    with np.errstate(all="ignore"):
+        values = func(t)
+        window = _value_window(values)
+        while t.size < budget:
+            errors = _interval_errors(t, values, window)
+            split = np.flatnonzero((errors > tolerance) & (np.diff(t) > 2 * min_width))
+            if split.size == 0:
+                break
+            room = budget - t.size
+            if split.size > room:
+                # Spend the remaining budget on the worst intervals
+                split = np.sort(split[np.argsort(errors[split])[-room:]])
+            mid = (t[split] + t[split + 1]) / 2
+            t = np.insert(t, split + 1, mid)
+            values = np.insert(values, split + 1, func(mid), axis=1)
+
+        breaks = _find_breaks(func, t, values, window, budget)
+
+    if breaks.size:
+        position = np.searchsorted(t, breaks)
+        t = np.insert(t, position, breaks)
+        values = np.insert(values, position, np.nan, axis=1)
+    return t, values
@@ -1,5 +1,5 @@
 from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, computed_field
 from datetime import datetime
 
 
@@ -61,7 +61,7 @@ class Session(SessionBase):
 # Variable schemas
 class VariableBase(BaseModel):
     name: str
-    value_json: Dict[str, Any]
+    value_json: Dict[str, Any]  # {"value": ...}, or {"expression": ...} for a derived variable
 
 
 class VariableCreate(VariableBase):
@@ -126,10 +126,16 @@ class GraphUpdate(GraphBase):
 class Graph(GraphBase):
     id: int
     session_id: int
-    image_data: Optional[str] = None
+    image_data: Optional[str] = Field(default=None, exclude=True)  # blob reference, never inlined
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def image_url(self) -> Optional[str]:
+        # Saved images are fetched lazily from their own endpoint
+        return f"/api/graph/saved/{self.id}/image" if self.image_data else None
+
     class Config:
         from_attributes = True
 
@@ -161,11 +167,29 @@ class ComputeRequest(BaseModel):
 
 
 class ComputeResponse(BaseModel):
-    latex: str
+    latex: Optional[str] = None  # only rendered on request in standard/sweep modes
     result: Any
     type: str  # number, matrix, expression, error, etc.
 
 
+class CASJobRequest(ComputeRequest):
+    operation: str  # simplify, factor, expand, solve, integrate, differentiate, limit
+
+
+class MatrixRequest(BaseModel):
+    operation: str  # inv, det, solve, eig, eigsh, svd, lstsq, matmul
+    operands: List[Union[List[Any], Dict[str, Any]]]  # nested numbers, encoded arrays or sparse triplets
+    settings: Optional[Dict[str, Any]] = Field(default_factory=dict)
+
+
+class BatchComputeRequest(BaseModel):
+    items: List[ComputeRequest]
+
+
+class BatchComputeResponse(BaseModel):
+    results: List[ComputeResponse]
+
+
 # Graph request schemas
 class GraphRequest(BaseModel):
     expr: str
@@ -175,8 +199,8 @@ class GraphRequest(BaseModel):
 
 
 class GraphResponse(BaseModel):
-    plot_data: Dict[str, Any]
-    image: Optional[str] = None  # Base64 encoded PNG/SVG
+    plot_data: Dict[str, Any]  # with settings.output == "data", sampled arrays under "samples"
+    image: Optional[str] = None  # base64 data URL (png, webp or svg)
 
 
 # Export schemas
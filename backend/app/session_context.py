@@ -0,0 +1,83 @@
+"""
+Per-session evaluation contexts.
+
+A session's Variable rows are loaded once and kept with their values
+already materialized (nested lists and encoded payloads as NumPy arrays,
+sparse specs as CSR matrices), so an evaluation only needs the expression
+and the session id. Contexts live in a bounded LRU with a TTL and are
+dropped by the session variable write endpoints.
+"""
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import LRUCache
+from app.config import settings
+from app.matrix import decode_variable_value
+from app.sparse import is_sparse
+
+session_context_cache = LRUCache(
+    maxsize=settings.SESSION_CONTEXT_CACHE_SIZE,
+    ttl=settings.SESSION_CONTEXT_TTL_SECONDS,
+)
+
+
+class SessionContext(NamedTuple):
+    user_id: int
+    variables: Dict[str, Any]
+
+
+def materialize_value(value_json: Any) -> Any:
+    """Turn a variable's ``value_json`` into a value usable in expressions."""
+    if not isinstance(value_json, dict):
+        raise ValueError("Variable has no value")
+    if "value" in value_json and not isinstance(value_json["value"], list):
+        return value_json["value"]
+    value = decode_variable_value(value_json)
+    if isinstance(value, np.ndarray):
+        # Contexts are shared between requests, so arrays are read-only
+        value.flags.writeable = False
+    return value
+
+
+def _load(db: Session, session_id: int) -> Optional[SessionContext]:
+    db_session = db.query(models.Session).filter(models.Session.id == session_id).first()
+    if db_session is None:
+        return None
+    variables = {}
+    for variable in db.query(models.Variable).filter(models.Variable.session_id == session_id):
+        try:
+            variables[variable.name] = materialize_value(variable.value_json)
+        except (ValueError, KeyError, TypeError):
+            # Failed derived variables and malformed payloads stay unbound
+            continue
+    return SessionContext(user_id=db_session.user_id, variables=variables)
+
+
+def load_session_context(db: Session, session_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Return the materialized variables of a session owned by ``user_id``.
+
+    Returns None when the session does not exist or belongs to someone else.
+    """
+    context = session_context_cache.get(session_id)
+    if context is None:
+        context = _load(db, session_id)
+        if context is None:
+            return None
+        session_context_cache.set(session_id, context)
+    if context.user_id != user_id:
+        return None
+    return context.variables
+
+
+def invalidate_session_context(session_id: int) -> None:
+    """Drop a session's cached context after one of its variables changed."""
+    session_context_cache.pop(session_id)
+
+
+def context_array(value: Any) -> Any:
+    """Return a context value as a matrix operand (NumPy array or sparse matrix)."""
+    return value if is_sparse(value) else np.asarray(value)
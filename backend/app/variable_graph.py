@@ -0,0 +1,123 @@
+"""
+Dependency tracking for derived session variables.
+
+A variable whose ``value_json`` holds ``{"expression": "a*b + 1"}`` is
+derived from the names its expression uses, and its computed value is
+stored alongside as ``"value"``. When a variable changes, only the derived
+variables downstream of it are re-evaluated, in topological order; every
+other stored value is reused as is.
+"""
+import ast
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+from app.cache import LRUCache
+from app.config import settings
+
+# Free names of each expression, keyed by expression text
+names_cache = LRUCache(maxsize=settings.EXPRESSION_CACHE_SIZE)
+
+
+def variable_expression(value_json: Optional[Mapping[str, Any]]) -> Optional[str]:
+    """Return the expression of a derived variable, or None for a plain value."""
+    if isinstance(value_json, Mapping) and isinstance(value_json.get("expression"), str):
+        return value_json["expression"]
+    return None
+
+
+def expression_names(expr: str) -> FrozenSet[str]:
+    """Return every name an expression refers to (functions included)."""
+
+    def _names():
+        tree = ast.parse(expr.strip(), mode="eval")
+        return frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
+
+    return names_cache.get_or_create(expr, _names)
+
+
+class VariableGraph:
+    """Dependency DAG of one session's variables."""
+
+    def __init__(self, expressions: Mapping[str, Optional[str]]):
+        # name -> expression for derived variables, None for plain values
+        self.expressions = dict(expressions)
+        self.dependencies: Dict[str, FrozenSet[str]] = {}
+        self.dependents: Dict[str, set] = {}
+        for name, expr in self.expressions.items():
+            if expr is None:
+                continue
+            try:
+                names = expression_names(expr)
+            except SyntaxError as e:
+                raise ValueError(f"Invalid expression for {name}: {e.msg}")
+            self.dependencies[name] = names
+            for dependency in names:
+                self.dependents.setdefault(dependency, set()).add(name)
+
+    def affected(self, changed: Iterable[str]) -> List[str]:
+        """
+        Return ``changed`` and everything downstream of it in topological order.
+
+        Names may refer to variables that do not exist (yet), so creating a
+        variable recomputes whatever was waiting on it. Raises ValueError
+        if the affected subgraph contains a cycle.
+        """
+        seen = set()
+        queue = deque(changed)
+        while queue:
+            name = queue.popleft()
+            if name in seen:
+                continue
+            seen.add(name)
+            queue.extend(self.dependents.get(name, ()))
+
+        # Kahn's algorithm restricted to the affected subgraph
+        indegree = {
+            name: sum(1 for dependency in self.dependencies.get(name, ()) if dependency in seen and dependency != name)
+            for name in seen
+        }
+        for name in seen:
+            if name in self.dependencies.get(name, ()):
+                raise ValueError(f"Variable {name} depends on itself")
+        ready = deque(sorted(name for name, degree in indegree.items() if degree == 0))
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in sorted(self.dependents.get(name, ())):
+                if dependent in indegree:
+                    indegree[dependent] -= 1
+                    if indegree[dependent] == 0:
+                        ready.append(dependent)
+        if len(order) != len(seen):
+            cycle = sorted(name for name in seen if name not in order)
+            raise ValueError(f"Circular dependency between variables: {', '.join(cycle)}")
+        return order
+
+    def recompute(
+        self,
+        values: Dict[str, Any],
+        changed: Iterable[str],
+        evaluate: Callable[[str, Dict[str, Any]], Any],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Re-evaluate the derived variables affected by ``changed``.
+
+        ``values`` maps variable names to their current values and is
+        updated in place. Returns the new ``value_json`` of each derived
+        variable that was re-evaluated; a failed evaluation is recorded as
+        ``"error"`` and its dependents fail in turn.
+        """
+        updates = {}
+        for name in self.affected(changed):
+            expr = self.expressions.get(name)
+            if expr is None:
+                continue
+            bound = {dependency: values[dependency] for dependency in self.dependencies[name] if dependency in values}
+            try:
+                values[name] = evaluate(expr, bound)
+                updates[name] = {"expression": expr, "value": values[name]}
+            except Exception as e:
+                values.pop(name, None)
+                updates[name] = {"expression": expr, "error": str(e)}
+        return updates
@@ -0,0 +1,135 @@
+"""
+Warm-up of slow first calls.
+
+The first SymPy simplify/integrate, the first matplotlib savefig (font
+cache) and the first scipy.stats distribution call in a process are much
+slower than later ones. ``run_warmup`` exercises them once at startup, in
+a background thread, and the readiness endpoint reports ready only after
+it finishes; ``/api/health`` stays a plain liveness check.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+
+
+def warm_sympy() -> None:
+    import sympy as sp
+
+    x = sp.Symbol("x")
+    sp.simplify(sp.sin(x) ** 2 + sp.cos(x) ** 2)
+    sp.integrate(x * sp.exp(x), x)
+    sp.latex(sp.sympify("x**2 + 1"))
+
+
+def warm_matplotlib() -> None:
+    from app import charts
+    from app.rendering import render_pool
+
+    # One render per worker spawns the whole pool and loads matplotlib in each
+    futures = [
+        render_pool.submit(charts.histogram, [0.0, 1.0, 1.0, 2.0], "auto", "warm-up", "x", "y", "blue")
+        for _ in range(render_pool.max_workers)
+    ]
+    for future in futures:
+        future.result(timeout=render_pool.timeout)
+
+
+def warm_scipy_stats() -> None:
+    import scipy.stats as stats
+
+    stats.norm(loc=0, scale=1).cdf(0.5)
+    stats.t.ppf(0.975, df=10)
+    stats.linregress([0, 1, 2], [1, 3, 5])
+
+
+def warm_cas_workers() -> None:
+    from app.cas_executor import cas_executor
+
+    # One concurrent task per worker spawns the whole pool and loads SymPy in
+    # each; submit blocks, so each task runs on its own thread
+    with ThreadPoolExecutor(max_workers=cas_executor.max_workers) as pool:
+        futures = [
+            pool.submit(cas_executor.submit, "simplify", "sin(x)**2 + cos(x)**2", {}, wait=True)
+            for _ in range(cas_executor.max_workers)
+        ]
+        for future in futures:
+            future.result()
+
+
+WARMUP_TASKS: Dict[str, Callable[[], None]] = {
+    "sympy": warm_sympy,
+    "matplotlib": warm_matplotlib,
+    "scipy_stats": warm_scipy_stats,
+    "cas_workers": warm_cas_workers,
+}
+
+
+class WarmupState:
+    """Progress of the warm-up, read by the readiness endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = PENDING
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            duration = None
+            if self.started_at is not None and self.finished_at is not None:
+                duration = round(self.finished_at - self.started_at, 3)
+            return {
+                "status": self.status,
+                "tasks": {name: dict(task) for name, task in self.tasks.items()},
+                "duration_seconds": duration,
+            }
+
+
+warmup_state = WarmupState()
+
+
+def run_warmup(tasks: Optional[List[str]] = None, state: WarmupState = warmup_state) -> None:
+    """Run the configured warm-up tasks in order, recording each one's duration or error.
+
+    A failed task is recorded but does not hold back readiness: warm-up
+    only makes first requests faster, it is never needed for correctness.
+    """
+    names = settings.WARMUP_TASKS if tasks is None else tasks
+    with state._lock:
+        state.status = RUNNING
+        state.started_at = time.perf_counter()
+    for name in names:
+        task = WARMUP_TASKS.get(name)
+        started = time.perf_counter()
+        try:
+            if task is None:
+                raise ValueError(f"Unknown warm-up task: {name}")
+            task()
+            result = {"seconds": round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            result = {"seconds": round(time.perf_counter() - started, 3), "error": str(e)}
+        with state._lock:
+            state.tasks[name] = result
+    with state._lock:
+        state.status = READY
+        state.finished_at = time.perf_counter()
+
+
+def start_warmup() -> None:
+    """Start the warm-up in a daemon thread, or mark ready at once when disabled."""
+    if not settings.WARMUP_ENABLED:
+        run_warmup(tasks=[])
+        return
+    threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
@@ -6,9 +6,9 @@ from sqlalchemy.orm import Session
 from app.database import get_db, engine, Base
 from app.routers import auth, sessions, compute, graph, export, stats, units
 from app.config import settings
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from app.cas_executor import cas_executor
+from app.rendering import render_pool
+from app.warmup import start_warmup, warmup_state
 
 app = FastAPI(
     title="Scientific Calculator API",
@@ -35,11 +35,39 @@ app.include_router(stats.router, prefix="/api/stats", tags=["Statistics"])
 app.include_router(units.router, prefix="/api/units", tags=["Units"])
 
 
+@app.on_event("startup")
+def create_tables():
+    # Schema creation runs at startup rather than at import time, so importing
+    # the app (tests, tooling, worker forks) never touches the database
+    Base.metadata.create_all(bind=engine)
+
+
+@app.on_event("startup")
+def warm_up():
+    start_warmup()
+
+
+@app.on_event("shutdown")
+def shutdown_cas_executor():
+    compute.job_backend.shutdown()
+    cas_executor.shutdown()
+    render_pool.shutdown()
+
+
 @app.get("/api/health")
 def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
 
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness probe: 503 until the warm-up has finished."""
+    state = warmup_state.snapshot()
+    if not warmup_state.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=state)
+    return state
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     return JSONResponse(
@@ -0,0 +1,19 @@
+import numpy as np
+
+from app.expressions import compile_expression, evaluate_chunked
+
+
+def test_chunked_elementwise_matches_unchunked():
+    x = np.arange(10.0)
+    compiled = compile_expression("sin(x) * 2 + x", bound=["x"])
+    assert compiled.elementwise
+    result = evaluate_chunked(compiled, {"x": x}, (10,), chunk_elements=4)
+    np.testing.assert_allclose(result, np.sin(x) * 2 + x)
+
+
+def test_chunked_subscript_sees_whole_operand():
+    x = np.arange(10.0)
+    compiled = compile_expression("x - x[0]", bound=["x"])
+    assert not compiled.elementwise
+    result = evaluate_chunked(compiled, {"x": x}, (10,), chunk_elements=4)
+    np.testing.assert_array_equal(result, x)
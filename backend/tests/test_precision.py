@@ -0,0 +1,11 @@
+from app.expressions import NAMESPACE
+from app.precision import evaluate_precise, precise_namespace
+
+
+def test_precise_namespace_covers_standard_namespace():
+    names = set(precise_namespace(15)) - {"__context__", "mpf"}
+    assert names == set(NAMESPACE)
+
+
+def test_precise_pow():
+    assert evaluate_precise("pow(2, 10)", {}, 15)["result"] == "1024.0"